@@ -0,0 +1,337 @@
+"""
+GitHub access shared by the checks of a stage.
+
+This module ships with every stage, so the tests only need PyGithub. The client is built on the
+first call to ``get_client``, and repositories returned by ``get_repo`` are lazy PyGithub objects
+that only request data when a check first uses them. Both are memoized, so all checks of a
+grading run reuse the same connection and repository handle.
+
+The checks read files through a snapshot of the repository: one recursive git-trees call, then
+blobs downloaded on first use and memoized by sha, with ``get_contents``-style lookups served
+from memory. A ``Prefetcher`` starts the API calls of a stage's checks up front on a bounded
+thread pool, while the checks still run one after another; ``GRADER_WORKERS=0`` turns that off.
+
+The module is the same file in every stage. In the course repository, ``grader.stages`` keeps
+the copies in sync and configures them for the batch grader and the benchmark: a rate-limited,
+cached session, snapshots read from local git sources, and one set of repositories, snapshots
+and blobs shared by the stages. The checks run the same code either way.
+"""
+import base64
+import os
+import posixpath
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from github import Auth, Consts, Github, UnknownObjectException
+from github.Requester import Requester, RequestsResponse
+
+# Connections kept alive per host
+POOL_SIZE = 16
+WORKERS = int(os.getenv("GRADER_WORKERS", "8"))
+
+_client = None
+_repos = {}
+_lock = threading.Lock()
+
+_session = None
+_session_lock = threading.Lock()
+
+# Blobs are addressed by their sha, so they can be shared between snapshots.
+_blobs = {}
+_blobs_lock = threading.Lock()
+# One download per blob, even when a prefetch and a check ask for it at the same time
+_blob_locks = {}
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+# Set with set_snapshot_opener; None reads the repository through the API
+_snapshot_opener = None
+
+_TYPES = {"blob": "file", "tree": "dir", "commit": "submodule"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# PyGithub's pause between two requests; None when the session paces the requests itself
+SECONDS_BETWEEN_REQUESTS = Consts.DEFAULT_SECONDS_BETWEEN_REQUESTS
+
+
+def full_repo_name(url):
+    """Turn ``https://github.com/user/repo(.git)`` into ``user/repo``."""
+    parts = url.strip().rstrip("/").split("/")
+    if len(parts) < 2 or not parts[-1] or not parts[-2]:
+        raise ValueError("The URL in main.py is not set or is not a valid repository URL.")
+    repo_name = parts[-1].replace(".git", "")  # Remove .git if present
+    username = parts[-2]
+    return f"{username}/{repo_name}"
+
+
+def get_session(pool_size=None, retry=None):
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Same as PyGithub: a non-None auth disables the fallback to .netrc
+                session.auth = Requester.noopAuth
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=pool_size or requests.adapters.DEFAULT_POOLSIZE,
+                    pool_maxsize=pool_size or requests.adapters.DEFAULT_POOLSIZE,
+                    max_retries=retry or 0,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def set_session(session):
+    """Send every request through ``session`` instead of the one ``get_session`` builds."""
+    global _session
+    with _session_lock:
+        _session = session
+
+
+class HTTPSConnection:
+    # PyGithub stores the pending request on its one shared connection object, which is not safe
+    # across threads; these connection objects keep it per request and share one session
+    protocol = "https"
+    default_port = 443
+
+    def __init__(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+        self.host = host
+        self.port = port if port else self.default_port
+        self.timeout = timeout
+        self.retry = retry
+        self.pool_size = pool_size
+        self.verify = kwargs.get("verify", True)
+
+    def request(self, verb, url, input, headers, stream=False):
+        self.verb = verb
+        self.url = url
+        self.input = input
+        self.headers = headers
+        self.stream = stream
+
+    def getresponse(self):
+        session = get_session(self.pool_size, self.retry)
+        r = session.request(
+            self.verb,
+            f"{self.protocol}://{self.host}:{self.port}{self.url}",
+            headers=self.headers,
+            data=self.input,
+            timeout=self.timeout,
+            verify=self.verify,
+            allow_redirects=False,
+        )
+        return RequestsResponse(r)
+
+    def close(self):
+        # The shared session outlives the connection objects PyGithub creates and drops.
+        pass
+
+
+class HTTPConnection(HTTPSConnection):
+    protocol = "http"
+    default_port = 80
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                Requester.injectConnectionClasses(HTTPConnection, HTTPSConnection)
+                token = os.getenv("GITHUB_TOKEN")
+                auth = Auth.Token(token) if token else None
+                base_url = os.getenv("GITHUB_API_URL", Consts.DEFAULT_BASE_URL)
+                _client = Github(auth=auth, base_url=base_url, pool_size=POOL_SIZE,
+                                 seconds_between_requests=SECONDS_BETWEEN_REQUESTS)
+    return _client
+
+
+def get_repo(url):
+    name = full_repo_name(url)
+    with _lock:
+        repo = _repos.get(name)
+    if repo is None:
+        # Lazy: no request until a check reads an attribute or lists something from the repository
+        repo = get_client().get_repo(name, lazy=True)
+        with _lock:
+            repo = _repos.setdefault(name, repo)
+    return repo
+
+
+class SnapshotFile:
+    """A tree entry that mimics the attributes of a PyGithub ``ContentFile``."""
+
+    def __init__(self, snapshot, path, type, sha, size=0):
+        self._snapshot = snapshot
+        self.path = path
+        self.name = posixpath.basename(path)
+        self.type = type
+        self.sha = sha
+        self.size = size
+
+    @property
+    def decoded_content(self):
+        if self.type != "file":
+            return None
+        return self._snapshot.read_blob(self.sha)
+
+    def __repr__(self):
+        return f'SnapshotFile(path="{self.path}", type="{self.type}")'
+
+
+class RepoSnapshot:
+    def __init__(self, repo, ref=None):
+        self.repo = repo
+        self.ref = ref
+        self.truncated = False
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self._entries = self._load_tree()
+        return self._entries
+
+    def _load_tree(self):
+        tree = self.repo.get_git_tree(self.ref or self.repo.default_branch, recursive=True)
+        self.truncated = bool(tree.raw_data.get("truncated"))
+        entries = {}
+        for element in tree.tree:
+            entry_type = _TYPES.get(element.type, element.type)
+            entries[element.path] = SnapshotFile(self, element.path, entry_type, element.sha,
+                                                 element.size or 0)
+        return entries
+
+    def read_blob(self, sha):
+        with _blobs_lock:
+            if sha in _blobs:
+                return _blobs[sha]
+            lock = _blob_locks.setdefault(sha, threading.Lock())
+        with lock:
+            with _blobs_lock:
+                if sha in _blobs:
+                    return _blobs[sha]
+            blob = self.repo.get_git_blob(sha)
+            if blob.encoding == "base64":
+                content = base64.b64decode(blob.content)
+            else:
+                content = blob.content.encode()
+            with _blobs_lock:
+                _blobs[sha] = content
+        return content
+
+    def iter_files(self):
+        """Yield every entry but directories, submodules included, in the order the API returned them."""
+        for entry in self.entries.values():
+            if entry.type != "dir":
+                yield entry
+
+    def exists(self, path):
+        try:
+            self.get_contents(path)
+            return True
+        except UnknownObjectException:
+            return False
+
+    def get_contents(self, path):
+        """Return a file entry, or the list of entries directly under a directory."""
+        path = path.strip("/")
+        entries = self.entries
+        if path and path in entries and entries[path].type != "dir":
+            return entries[path]
+        if not path or path in entries:
+            prefix = f"{path}/" if path else ""
+            return [entry for entry_path, entry in entries.items()
+                    if entry_path.startswith(prefix) and "/" not in entry_path[len(prefix):]]
+        if self.truncated:
+            # The listing was cut short by the API, so the path may still exist.
+            return self.repo.get_contents(path)
+        raise UnknownObjectException(404, {"message": "Not Found"})
+
+
+def get_snapshot(repo_url):
+    """Return the snapshot of a repository shared by every check of the current grading run."""
+    name = full_repo_name(repo_url)
+    with _snapshots_lock:
+        if name not in _snapshots:
+            if _snapshot_opener is not None:
+                _snapshots[name] = _snapshot_opener(repo_url)
+            else:
+                _snapshots[name] = RepoSnapshot(get_repo(repo_url))
+        return _snapshots[name]
+
+
+def set_snapshot_opener(opener):
+    """Build the snapshots with ``opener(repo_url)`` instead of reading them through the API."""
+    global _snapshot_opener
+    _snapshot_opener = opener
+
+
+def reset():
+    """Forget the repositories, snapshots and blobs loaded so far."""
+    with _lock:
+        _repos.clear()
+    with _snapshots_lock:
+        _snapshots.clear()
+    with _blobs_lock:
+        _blobs.clear()
+        _blob_locks.clear()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="prefetch")
+    return _executor
+
+
+def drain():
+    """Wait for the prefetches still running, e.g. those of checks a failure skipped."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+class Prefetcher:
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self._loaders = {}
+        self._futures = {}
+
+    def add(self, name, loader, *args):
+        self._loaders[name] = (loader, args)
+        if self.workers > 0:
+            self._futures[name] = get_executor().submit(loader, *args)
+
+    def add_files(self, snapshot, *paths):
+        # Only warms the snapshot: the checks read the files from it and handle errors themselves.
+        for path in paths:
+            self.add(path, _read_file, snapshot, path)
+
+    def get(self, name):
+        """Return the result of a loader, re-raising its exception in the calling check."""
+        future = self._futures.get(name)
+        if future is None:
+            loader, args = self._loaders[name]
+            future = self._futures[name] = Future()
+            try:
+                future.set_result(loader(*args))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+
+def _read_file(snapshot, path):
+    return snapshot.get_contents(path).decoded_content
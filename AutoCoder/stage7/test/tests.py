@@ -1,17 +1,37 @@
 import yaml
 from hstest import StageTest, CheckResult, dynamic_test
-from github import Github, GithubException
-import os
+from github import GithubException
 import re
 from AutoCoder.stage7.main import url
+from .repository import full_repo_name, get_repo, get_snapshot, Prefetcher
 
 
 class GitTest(StageTest):
-    g = Github(os.getenv("GITHUB_TOKEN")) if os.getenv("GITHUB_TOKEN") else Github()
-    repo_name = url.split('/')[-1].replace('.git', '')
-    username = url.split('/')[-2]
-    full_repo_name = f"{username}/{repo_name}"
-    repo = g.get_repo(full_repo_name)
+    # The batch grader points the same test class at other repositories
+    repo_url = url
+    repo = None
+
+    def setup(self):
+        if self.repo is None:
+            self.repo = get_repo(self.repo_url)
+            # Start every API call the checks need at once; the checks themselves still run in order
+            self.prefetched = Prefetcher()
+            self.prefetched.add_files(self.snapshot, "action.yml", ".github/workflows/main.yml")
+            self.prefetched.add("workflow_runs", lambda: list(self.repo.get_workflow_runs().get_page(0)))
+            self.prefetched.add("pull_requests", self.load_pull_requests)
+
+    def load_pull_requests(self):
+        pull_requests = list(self.repo.get_pulls(state='open', sort='created', direction='desc'))
+        commits = []
+        if pull_requests:
+            # mergeable_state is not part of the list response, so complete the first pull request as well
+            pull_requests[0].mergeable_state
+            commits = list(pull_requests[0].get_commits())
+        return pull_requests, commits
+
+    @property
+    def snapshot(self):
+        return get_snapshot(self.repo_url)
 
     @classmethod
     def handle_github_exception(self, e):
@@ -27,7 +47,8 @@ class GitTest(StageTest):
     @dynamic_test
     def check_action_file_exists(self):
         try:
-            contents = self.repo.get_contents("action.yml")
+            self.setup()
+            contents = self.snapshot.get_contents("action.yml")
             if not contents:
                 return CheckResult.wrong("The file 'action.yml' does not exist.")
             return CheckResult.correct()
@@ -39,7 +60,8 @@ class GitTest(StageTest):
     @dynamic_test
     def check_action_file_contents(self):
         try:
-            contents = self.repo.get_contents("action.yml")
+            self.setup()
+            contents = self.snapshot.get_contents("action.yml")
             action_file = contents.decoded_content.decode()
             action_metadata = yaml.load(action_file, Loader=yaml.BaseLoader)
 
@@ -83,7 +105,8 @@ class GitTest(StageTest):
     @dynamic_test
     def check_main_file_exists(self):
         try:
-            files = self.repo.get_contents(".github/workflows")
+            self.setup()
+            files = self.snapshot.get_contents(".github/workflows")
             main_yaml_file_exists = any(
                 file.path == ".github/workflows/main.yml" or file.path == ".github/workflows/main.yaml" for file in files)
             if not main_yaml_file_exists:
@@ -95,7 +118,8 @@ class GitTest(StageTest):
     @dynamic_test
     def check_workflow_manifest(self):
         try:
-            contents = self.repo.get_contents(".github/workflows/main.yml")
+            self.setup()
+            contents = self.snapshot.get_contents(".github/workflows/main.yml")
             workflow_file = contents.decoded_content.decode()
             new_workflow = yaml.load(workflow_file, Loader=yaml.BaseLoader)
 
@@ -115,7 +139,7 @@ class GitTest(StageTest):
 
             expected_steps = {
                 "checkout__the_repository": "actions/checkout@",
-                "interact_with_ChatGPT": f"{self.full_repo_name}@",
+                "interact_with_ChatGPT": f"{full_repo_name(self.repo_url)}@",
             }
 
             for step_name, expected_value in expected_steps.items():
@@ -130,7 +154,8 @@ class GitTest(StageTest):
     @dynamic_test
     def check_workflow_run_on_issues(self):
         try:
-            latest_workflow_run = list(self.repo.get_workflow_runs().get_page(0))[0]
+            self.setup()
+            latest_workflow_run = self.prefetched.get("workflow_runs")[0]
             if latest_workflow_run.event != "issues":
                 return CheckResult.wrong(f"The latest workflow run was not triggered by an issue event.")
             if latest_workflow_run.conclusion != "success":
@@ -143,8 +168,9 @@ class GitTest(StageTest):
     @dynamic_test
     def check_pull_request_details(self):
         try:
-            # Get a list of recent pull requests
-            pull_requests = list(self.repo.get_pulls(state='open', sort='created', direction='desc'))
+            self.setup()
+            # Get a list of recent pull requests and the commits of the newest one
+            pull_requests, commits = self.prefetched.get("pull_requests")
 
             if not pull_requests:
                 return CheckResult.wrong("No open pull requests found in the repository.")
@@ -165,7 +191,6 @@ class GitTest(StageTest):
                 return CheckResult.wrong("The pull request has conflicts with the base branch. Rerun the workflow.")
 
             # Verify commit author details
-            commits = list(pr.get_commits())
             for commit in commits:
                 author_name = commit.commit.author.name
                 author_email = commit.commit.author.email
@@ -0,0 +1,6 @@
+"""
+AutoCoder generation engine: turns an issue into files under ``autocoder-bot/``.
+
+A Python counterpart of ``scripts/script.sh`` that runs the whole flow in one process,
+see ``autocoder_bot.engine``. Run it with ``python -m autocoder_bot``.
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from autocoder_bot.cli import main
+
+sys.exit(main())
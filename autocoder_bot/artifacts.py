@@ -0,0 +1,186 @@
+"""
+Content-addressed, compressed packs of the generated files, for artifacts.
+
+Uploading ``autocoder-bot/*`` as an artifact sends every file on its own, duplicates included,
+through the artifact service's per-file upload and compression. A pack is a directory holding
+``manifest.json``, which lists every file with the sha256 of its content, and ``objects.tar.gz``,
+which holds each distinct content once under its hash. Every pack is self-contained: whoever
+downloads the artifact can unpack it without anything from the run that made it.
+
+With ``--changed-only`` the pack holds only the files whose content differs from the commit
+checked out, and the manifest records that commit as its ``base`` along with the files
+``deleted`` since. Such a pack is still complete on its own: unpacked over a checkout of its
+base, it gives the generated files.
+
+    python -m autocoder_bot.artifacts pack autocoder-bot autocoder-artifact
+    python -m autocoder_bot.artifacts pack --changed-only autocoder-bot autocoder-artifact
+    python -m autocoder_bot.artifacts unpack autocoder-artifact autocoder-bot
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tarfile
+
+MANIFEST = "manifest.json"
+OBJECTS = "objects.tar.gz"
+MANIFEST_VERSION = 1
+
+
+class PackError(Exception):
+    pass
+
+
+def file_sha(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def git_blob_sha(path):
+    """The sha git gives the content of ``path``, to compare it with a tree without hashing the tree."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def committed_blobs(source):
+    """The commit checked out in the repository of ``source``, and ``{path: blob sha}`` of ``source`` in it."""
+    try:
+        base = subprocess.run(["git", "-C", source, "rev-parse", "HEAD"], check=True, capture_output=True,
+                              text=True).stdout.strip()
+        # Run from inside source, ls-tree lists only that directory, with paths relative to it
+        listing = subprocess.run(["git", "-C", source, "ls-tree", "-r", "-z", base], check=True,
+                                 capture_output=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise PackError(f"No commit to compare {source} with: {e}")
+    blobs = {}
+    for line in listing.decode(errors="replace").split("\0"):
+        if line:
+            info, path = line.split("\t", 1)
+            _, kind, sha = info.split()
+            if kind == "blob":
+                blobs[path] = sha
+    return base, blobs
+
+
+def build_manifest(source):
+    """``{path: {sha256, size, mode}}`` of every file under ``source``, with ``/`` separated paths."""
+    files = {}
+    for directory, directories, names in os.walk(source):
+        directories.sort()
+        for name in sorted(names):
+            path = os.path.join(directory, name)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            relative = os.path.relpath(path, source).replace(os.sep, "/")
+            files[relative] = {"sha256": file_sha(path), "size": stat.st_size, "mode": stat.st_mode & 0o777}
+    return files
+
+
+def add_object(tar, sha, path):
+    info = tar.gettarinfo(path, arcname=sha)
+    # Same bytes, same archive entry, whatever the file was called or when it was written
+    info.mtime, info.mode, info.uid, info.gid, info.uname, info.gname = 0, 0o644, 0, 0, "", ""
+    with open(path, "rb") as f:
+        tar.addfile(info, f)
+
+
+def pack(source, destination, changed_only=False):
+    """Pack ``source`` into the directory ``destination``; return the manifest written there."""
+    files = build_manifest(source)
+    extra = {}
+    if changed_only:
+        base, committed = committed_blobs(source)
+        extra = {"base": base, "deleted": sorted(set(committed) - set(files))}
+        files = {relative: entry for relative, entry in files.items()
+                 if committed.get(relative) != git_blob_sha(os.path.join(source, *relative.split("/")))}
+    elif not files:
+        raise PackError(f"No files to pack in {source}")
+    paths = {}
+    for relative, entry in files.items():
+        paths.setdefault(entry["sha256"], os.path.join(source, *relative.split("/")))
+
+    os.makedirs(destination, exist_ok=True)
+    with tarfile.open(os.path.join(destination, OBJECTS), "w:gz", compresslevel=9) as tar:
+        for sha in sorted(paths):
+            add_object(tar, sha, paths[sha])
+    manifest = {"version": MANIFEST_VERSION, "files": files, "objects": len(paths), **extra}
+    with open(os.path.join(destination, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def unpack(pack_dir, destination):
+    """Write the files of the pack in ``pack_dir`` under ``destination``, removing those it deleted;
+    return the paths written."""
+    with open(os.path.join(pack_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise PackError(f"Unsupported pack version {manifest.get('version')}")
+    objects = {}
+    with tarfile.open(os.path.join(pack_dir, OBJECTS), "r:gz") as tar:
+        for member in tar.getmembers():
+            objects[member.name] = tar.extractfile(member).read()
+
+    root = os.path.abspath(destination)
+    written = []
+    for relative, entry in sorted(manifest["files"].items()):
+        path = destination_path(root, destination, relative)
+        data = objects.get(entry["sha256"])
+        if data is None:
+            raise PackError(f"Object {entry['sha256']} of {relative} is missing from the pack")
+        if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            raise PackError(f"Corrupted object for {relative}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        os.chmod(path, entry["mode"])
+        written.append(path)
+    for relative in manifest.get("deleted", ()):
+        path = destination_path(root, destination, relative)
+        if os.path.isfile(path):
+            os.remove(path)
+    return written
+
+
+def destination_path(root, destination, relative):
+    path = os.path.abspath(os.path.join(root, *relative.split("/")))
+    if os.path.commonpath([root, path]) != root or path == root:
+        raise PackError(f"Refusing to unpack outside {destination}: {relative}")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m autocoder_bot.artifacts",
+                                     description="Pack generated files for an artifact, or unpack such a pack.")
+    parser.add_argument("command", choices=("pack", "unpack"))
+    parser.add_argument("source", help="directory to pack, or the pack to unpack")
+    parser.add_argument("destination", help="pack directory to write, or directory to unpack into")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="pack only the files that differ from the commit checked out")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "pack":
+            manifest = pack(args.source, args.destination, changed_only=args.changed_only)
+            size = os.path.getsize(os.path.join(args.destination, OBJECTS))
+            changed = f" changed since {manifest['base'][:7]}" if args.changed_only else ""
+            print(f"Packed {len(manifest['files'])} file(s){changed}, {manifest['objects']} distinct, "
+                  f"into {size} bytes: {args.destination}")
+        else:
+            written = unpack(args.source, args.destination)
+            print(f"Unpacked {len(written)} file(s) into {args.destination}")
+    except (OSError, ValueError, tarfile.TarError, PackError) as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Backlog mode: every open issue with the trigger label, handled by one run.
+
+The action generates code for the single issue of the event that started it, so a backlog of
+labelled issues costs one runner, one checkout and one API session per issue. Run from a
+scheduled or manually dispatched workflow of its own, next to the issue-triggered one, this
+module lists the open issues carrying the label (the way the stage tests do), generates their
+code concurrently with a bounded pool sharing the engine's HTTP session, then, from the one
+checkout it runs in, commits each issue's files on its own ``autocoder-branch-<n>`` branch,
+pushes all branches at once and opens one pull request per issue. Issues whose body has not
+changed since their code was generated are skipped, as with ``autocoder_bot.dedup``.
+
+    python -m autocoder_bot.backlog --label autocoder-bot --concurrency 8 [engine options]
+
+Options not listed by ``--help`` are those of ``python -m autocoder_bot``; the GitHub token,
+repository and OpenAI key come from the same environment variables.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from github import GithubException
+
+from autocoder_bot import cli, dedup, engine, providers
+
+CONCURRENCY = 4
+MAX_ISSUES = 100
+BRANCH_PREFIX = "autocoder-branch-"
+COMMITTER = ["-c", "user.name=autocoder-bot", "-c", "user.email=actions@github.com"]
+
+
+def git(*args):
+    return subprocess.run(["git", *args], check=True, capture_output=True, text=True).stdout.strip()
+
+
+def open_issues(repo, label, limit=MAX_ISSUES):
+    """The open issues with ``label`` and a description, oldest first; pull requests are left out."""
+    issues = []
+    for issue in repo.get_issues(state="open", labels=[label], sort="created", direction="asc"):
+        if issue.pull_request is None and issue.body:
+            issues.append(issue)
+            if len(issues) >= limit:
+                break
+    return issues
+
+
+def is_unchanged(issue):
+    """``dedup.is_unchanged``, where an issue whose record cannot be read counts as changed."""
+    try:
+        return dedup.is_unchanged(issue)
+    except GithubException as e:
+        print(f"Issue #{issue.number}: could not read its last generation ({e.status}), generating it again.")
+        return False
+
+
+def generate_issue(issue, engine_args, workdir):
+    """Generate the files of one issue into its own copy of the output directory; return that copy."""
+    options = cli.engine_options(engine_args)
+    output_dir = os.path.join(workdir, str(issue.number))
+    if os.path.isdir(options["output_dir"]):
+        # Patch mode and the context read the files generated before
+        shutil.copytree(options["output_dir"], output_dir)
+    # The context comes from the checkout, where the files generated before are under the real output directory
+    engine.generate(engine_args.GITHUB_TOKEN, engine_args.REPOSITORY, issue.number, engine_args.OPENAI_API_KEY,
+                    cache=cli.open_cache(engine_args),
+                    **{**options, "output_dir": output_dir, "context_dir": options["output_dir"]})
+    return output_dir
+
+
+def commit_branch(issue, generated, output_dir, branch, start):
+    """Commit the generated files on ``branch``, started from ``start``; False if nothing changed."""
+    git("checkout", "-q", "-B", branch, start)
+    shutil.copytree(generated, output_dir, dirs_exist_ok=True)
+    git("add", "--", output_dir)
+    if subprocess.run(["git", "diff", "--cached", "--quiet"]).returncode == 0:
+        return False
+    git(*COMMITTER, "commit", "-q", "-m", f"Add code snippets from issue #{issue.number}")
+    return True
+
+
+def open_pull_request(repo, owner, issue, branch, base, label):
+    """The open pull request of ``branch``, created if there is none; and whether it was created."""
+    existing = list(repo.get_pulls(state="open", head=f"{owner}:{branch}"))
+    if existing:
+        return existing[0], False
+    pull = repo.create_pull(base=base, head=branch, title=f"Add code snippets from issue #{issue.number}",
+                            body=f"This pull request adds code snippets from issue #{issue.number}.")
+    pull.add_to_labels(label)
+    return pull, True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m autocoder_bot.backlog",
+                                     description="Generate code for every open issue with the label, "
+                                                 "one branch and pull request per issue.",
+                                     epilog="Other options are passed to python -m autocoder_bot.")
+    parser.add_argument("--label", default=os.getenv("LABEL") or "autocoder-bot",
+                        help="default: $LABEL or autocoder-bot")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="issues generated at the same time (default: %(default)s)")
+    parser.add_argument("--limit", type=int, default=MAX_ISSUES, help="issues handled per run (default: %(default)s)")
+    parser.add_argument("--base", default="main", help="branch the pull requests go into (default: %(default)s)")
+    parser.add_argument("--branch-prefix", default=BRANCH_PREFIX, help="default: %(default)s")
+    parser.add_argument("--no-skip-unchanged", dest="skip_unchanged", action="store_false",
+                        help="also generate for issues whose body has not changed since the last generation")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="commit the branches locally without pushing them or opening pull requests")
+    args, rest = parser.parse_known_args(argv)
+    engine_args = cli.build_parser().parse_args(rest)
+    try:
+        provider = providers.configure(engine_args.provider, engine_args.api_url, engine_args.hedge_after)
+    except ValueError as e:
+        parser.error(str(e))
+    required = ("REPOSITORY", "OPENAI_API_KEY") if provider.needs_key else ("REPOSITORY",)
+    missing = [name for name in required if not getattr(engine_args, name)]
+    if missing:
+        parser.error(f"missing {', '.join(missing)}")
+    output_dir = engine_args.output_dir
+
+    started = time.perf_counter()
+    repo = engine.get_repository(engine_args.GITHUB_TOKEN, engine_args.REPOSITORY)
+    issues = open_issues(repo, args.label, args.limit)
+    if args.skip_unchanged:
+        # One at a time: the issues share their PyGithub requester, which is not safe across threads
+        unchanged = [is_unchanged(issue) for issue in issues]
+        skipped = [issue.number for issue, same in zip(issues, unchanged) if same]
+        issues = [issue for issue, same in zip(issues, unchanged) if not same]
+    else:
+        skipped = []
+    print(f"{len(issues)} open issue(s) labelled {args.label} to generate"
+          + (f", {len(skipped)} unchanged since their last generation." if skipped else "."))
+    if not issues:
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="autocoder-backlog-")
+    generated, failed = {}, []
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = {pool.submit(generate_issue, issue, engine_args, workdir): issue for issue in issues}
+            for future in as_completed(futures):
+                issue = futures[future]
+                try:
+                    generated[issue.number] = future.result()
+                except engine.GenerationError as e:
+                    print(f"Issue #{issue.number}: {e}")
+                    failed.append(issue.number)
+
+        # One checkout: every branch starts from the commit checked out now
+        start = git("rev-parse", "HEAD")
+        original = git("rev-parse", "--abbrev-ref", "HEAD")
+        branches = {}
+        try:
+            for issue in issues:
+                if issue.number not in generated:
+                    continue
+                branch = f"{args.branch_prefix}{issue.number}"
+                if commit_branch(issue, generated[issue.number], output_dir, branch, start):
+                    branches[issue.number] = branch
+                else:
+                    print(f"Issue #{issue.number}: no changes to commit.")
+        finally:
+            git("checkout", "-q", start if original == "HEAD" else original)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if branches and not args.dry_run:
+        git("push", "-q", "--force", "origin", *(f"{branch}:refs/heads/{branch}" for branch in branches.values()))
+        owner = engine_args.REPOSITORY.split("/")[0]
+        for issue in issues:
+            if issue.number in branches:
+                pull, created = open_pull_request(repo, owner, issue, branches[issue.number], args.base, args.label)
+                print(f"Issue #{issue.number}: {'opened' if created else 'updated'} pull request #{pull.number}.")
+                if args.skip_unchanged:
+                    try:
+                        dedup.record(issue)
+                    except GithubException as e:
+                        print(f"Issue #{issue.number}: could not record the generation ({e.status}).")
+    print(f"{len(branches)} branch(es) with generated code, {len(failed)} issue(s) failed, "
+          f"in {time.perf_counter() - started:.1f}s.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Token budget of a generation, worked out before the model is called.
+
+``script.sh`` sends the raw issue body whatever its size and always allows 300 tokens for the
+answer, which truncates the JSON of any multi-file project. Before the call the engine now
+compacts the issue body: HTML comments of issue templates, images, repeated code blocks and the
+middle of long logs carry no instructions for the model. It counts the prompt's tokens locally and
+sizes ``max_tokens`` from the number of files the issue asks for, within the model's context window.
+
+Tokens are estimated from words and punctuation, close enough to the GPT tokenizers on English
+and code to size a budget, without shipping a tokenizer with the action.
+"""
+import math
+import re
+
+# Context windows of the chat models the action is used with; unknown models get the smallest
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+MIN_OUTPUT_TOKENS = 300
+TOKENS_PER_FILE = 400
+MAX_OUTPUT_TOKENS = 4096
+# Chat formatting the API adds around the messages
+MESSAGE_OVERHEAD = 8
+LOG_KEEP_LINES = 20
+
+TOKEN = re.compile(r"\w+|[^\w\s]")
+HTML_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+MARKDOWN_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+HTML_IMAGE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+CODE_BLOCK = re.compile(r"^(?P<fence>```|~~~)(?P<info>[^\n]*)\n(?P<body>.*?)^(?P=fence)[ \t]*$", re.DOTALL | re.MULTILINE)
+FILE_PATH = re.compile(r"(?<![\w/.-])(?:[\w.-]+/)*[\w-]+\.(?:[A-Za-z][A-Za-z0-9]{0,9})(?![\w/])")
+LOG_LANGUAGES = {"", "log", "logs", "text", "txt", "console", "output", "shell-session", "plaintext"}
+# Names that look like files but are technologies, as in "a Node.js server"
+NOT_FILES = {"node.js", "vue.js", "next.js", "nuxt.js", "express.js", "react.js", "three.js", "chart.js", "d3.js",
+             "asp.net", "socket.io"}
+
+
+def count_tokens(text):
+    """Estimated number of tokens: one per punctuation mark, one per four characters of a word."""
+    return sum(math.ceil(len(token) / 4) if token[0].isalnum() or token[0] == "_" else 1
+               for token in TOKEN.findall(text))
+
+
+def truncate_lines(lines, keep=LOG_KEEP_LINES):
+    if len(lines) <= 2 * keep + 1:
+        return lines
+    return lines[:keep] + [f"... ({len(lines) - 2 * keep} lines omitted) ..."] + lines[-keep:]
+
+
+def compact(issue_body):
+    """The issue body without what does not tell the model what to build."""
+    text = HTML_COMMENT.sub("", issue_body.replace("\r\n", "\n"))
+    text = MARKDOWN_IMAGE.sub(lambda match: f"[image: {match.group(1)}]" if match.group(1) else "", text)
+    text = HTML_IMAGE.sub("", text)
+
+    seen = set()
+
+    def code_block(match):
+        body = match.group("body")
+        if body in seen:
+            return "(same code as the block above)"
+        seen.add(body)
+        if match.group("info").strip().lower() in LOG_LANGUAGES:
+            body = "\n".join(truncate_lines(body.rstrip("\n").split("\n"))) + "\n"
+        return f"{match.group('fence')}{match.group('info')}\n{body}{match.group('fence')}"
+
+    text = CODE_BLOCK.sub(code_block, text)
+
+    # Long quotes are almost always pasted logs
+    lines, quote = [], []
+    for line in text.split("\n") + [None]:
+        if line is not None and line.startswith(">"):
+            quote.append(line)
+            continue
+        lines.extend(truncate_lines(quote))
+        quote = []
+        if line is not None:
+            lines.append(line.rstrip())
+    text = re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+    return text.strip()
+
+
+def expected_files(issue_body):
+    paths = {path.lower() for path in FILE_PATH.findall(issue_body)} - NOT_FILES
+    return max(1, len(paths))
+
+
+def plan_output(prompt, model, files=1):
+    """``max_tokens`` for an answer of ``files`` files that still fits in the model's context window."""
+    window = CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    available = window - count_tokens(prompt) - MESSAGE_OVERHEAD
+    wanted = min(MIN_OUTPUT_TOKENS + TOKENS_PER_FILE * files, MAX_OUTPUT_TOKENS)
+    return max(0, min(wanted, available))
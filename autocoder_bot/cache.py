@@ -0,0 +1,151 @@
+"""
+Content-addressed cache of generated files.
+
+Every ``opened``, ``reopened`` and ``labeled`` event runs the generation again, although
+re-labelling an issue sends exactly the same prompt. The files generated for a prompt are stored
+under the sha256 of the instructions, the issue body and the model parameters, so a repeated
+event writes them back in seconds without calling the model.
+
+Two backends are available: a directory with one JSON file per entry, which the action keeps
+between runs with ``actions/cache``, or a single SQLite file when the location ends with
+``.sqlite`` or ``.db``. Entries expire after a TTL and the least recently used ones are evicted
+once the cache grows past its size cap.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "autocoder-bot")
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_SIZE_MB = 64
+
+# The context index of autocoder_bot.context lives in the same directory and is not an entry
+ENTRY_DIR = re.compile(r"[0-9a-f]{2}")
+ENTRY_NAME = re.compile(r"[0-9a-f]{64}\.json")
+
+
+def cache_key(instructions, issue_body, **params):
+    """Hash of everything that decides what the model is asked."""
+    material = json.dumps({"instructions": instructions, "issue_body": issue_body, "params": params},
+                          sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class DirectoryCache:
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_SIZE_MB * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def get(self, key):
+        entry = self._entry(key)
+        try:
+            with open(entry) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - data.get("created", 0) > self.ttl:
+            self._remove(entry)
+            return None
+        # The modification time orders the entries for eviction
+        os.utime(entry)
+        return data["files"]
+
+    def put(self, key, files):
+        entry = self._entry(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        # Written next to its final name and renamed, so a concurrent reader never sees half an entry
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(entry), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"created": time.time(), "files": files}, f)
+        os.replace(temporary, entry)
+        self._evict()
+
+    def _remove(self, entry):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+    def _entries(self):
+        """Paths of the ``<2 hex>/<sha256>.json`` entries, leaving other files in the directory alone."""
+        for prefix in os.listdir(self.path):
+            directory = os.path.join(self.path, prefix)
+            if not ENTRY_DIR.fullmatch(prefix) or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if ENTRY_NAME.fullmatch(name) and name.startswith(prefix):
+                    yield os.path.join(directory, name)
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for used, size, path in sorted(entries):
+            if total <= self.max_bytes and now - used <= self.ttl:
+                continue
+            self._remove(path)
+            total -= size
+
+
+class SQLiteCache:
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_SIZE_MB * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        with self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS generations (
+                    key TEXT PRIMARY KEY,
+                    files TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )""")
+
+    def get(self, key):
+        now = time.time()
+        with self._db:
+            self._db.execute("DELETE FROM generations WHERE created < ?", (now - self.ttl,))
+            row = self._db.execute("SELECT files FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE generations SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key, files):
+        data = json.dumps(files)
+        now = time.time()
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?, ?)",
+                             (key, data, len(data.encode()), now, now))
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM generations").fetchone()[0]
+            stale = []
+            for old_key, size in self._db.execute("SELECT key, size FROM generations ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                stale.append((old_key,))
+                total -= size
+            self._db.executemany("DELETE FROM generations WHERE key = ?", stale)
+
+
+def open_cache(location=DEFAULT_PATH, ttl=DEFAULT_TTL, size_mb=DEFAULT_SIZE_MB):
+    location = os.path.expanduser(location)
+    backend = SQLiteCache if location.endswith((".sqlite", ".db")) else DirectoryCache
+    return backend(location, ttl=ttl, max_bytes=size_mb * 1024 * 1024)
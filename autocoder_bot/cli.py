@@ -0,0 +1,95 @@
+"""
+Command line of the generation engine, a drop-in for ``scripts/script.sh``.
+
+    python -m autocoder_bot GITHUB_TOKEN REPOSITORY ISSUE_NUMBER OPENAI_API_KEY
+
+The positional arguments are those of the script. Any of them can be left out and read from
+the environment variable of the same name instead, which keeps the secrets out of the process list.
+"""
+import argparse
+import os
+import sys
+
+from autocoder_bot import cache, engine, providers
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m autocoder_bot",
+                                     description="Generate the files an issue asks for into autocoder-bot/.")
+    for name in ("GITHUB_TOKEN", "REPOSITORY", "ISSUE_NUMBER", "OPENAI_API_KEY"):
+        parser.add_argument(name, nargs="?", default=os.getenv(name), help=f"default: ${name}")
+    parser.add_argument("--output-dir", default=engine.OUTPUT_DIR, help="default: %(default)s")
+    parser.add_argument("--model", default=engine.MODEL, help="default: %(default)s")
+    parser.add_argument("--max-tokens", type=int,
+                        help="per completion (default: sized from the prompt and the files the issue asks for, "
+                             "or 1024 per file with --plan)")
+    parser.add_argument("--no-budget", dest="budget", action="store_false",
+                        help=f"send the issue body as it is and allow {engine.MAX_TOKENS} tokens, like script.sh")
+    parser.add_argument("--no-recovery", dest="recover", action="store_false",
+                        help="fail on an answer that is not a clean JSON object instead of repairing it")
+    parser.add_argument("--no-validation", dest="validate", action="store_false",
+                        help="commit the generated files without checking their syntax first")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--stream", action="store_true",
+                      help="stream the completion and write each file as soon as it is complete")
+    mode.add_argument("--plan", action="store_true",
+                      help="ask for the list of files first, then generate each file with its own request")
+    mode.add_argument("--patch", action="store_true",
+                      help="ask for diffs against the existing code instead of whole files (implies --context)")
+    parser.add_argument("--workers", type=int, help="concurrent file requests with --plan (default: 4)")
+    parser.add_argument("--cache", nargs="?", const=cache.DEFAULT_PATH, default=os.getenv("AUTOCODER_CACHE"),
+                        help="reuse the code generated for an identical prompt, stored in a directory or a "
+                             ".sqlite file (default: $AUTOCODER_CACHE, or ~/.cache/autocoder-bot without a value)")
+    parser.add_argument("--cache-ttl", type=float, default=cache.DEFAULT_TTL / 3600,
+                        help="hours a cached generation stays valid (default: %(default)s)")
+    parser.add_argument("--cache-size-mb", type=int, default=cache.DEFAULT_SIZE_MB, help="default: %(default)s")
+    parser.add_argument("--context", nargs="?", const=".", metavar="ROOT",
+                        help="add the code of this git checkout that best matches the issue to the prompt "
+                             "(default without a value: .)")
+    parser.add_argument("--context-tokens", type=int, help="token budget of that code (default: 2000)")
+    parser.add_argument("--provider", default=os.getenv("AUTOCODER_PROVIDER", "openai"),
+                        help=f"{', '.join(providers.PROVIDERS)} (default: $AUTOCODER_PROVIDER or openai)")
+    parser.add_argument("--api-url", default=os.getenv("AUTOCODER_API_URL"),
+                        help="chat completions URL of a compatible server (default: $AUTOCODER_API_URL)")
+    parser.add_argument("--hedge-after", type=float, default=os.getenv("AUTOCODER_HEDGE_AFTER"),
+                        help="send a slow request a second time after this many seconds (default: off)")
+    return parser
+
+
+def engine_options(args):
+    """The keyword arguments of ``engine.generate`` given on the command line, besides the cache."""
+    return dict(output_dir=args.output_dir, model=args.model, max_tokens=args.max_tokens, stream=args.stream,
+                plan=args.plan, patch=args.patch, workers=args.workers, context_root=args.context,
+                context_tokens=args.context_tokens, budget=args.budget, recover=args.recover, validate=args.validate)
+
+
+def open_cache(args):
+    if not args.cache:
+        return None
+    return cache.open_cache(args.cache, ttl=args.cache_ttl * 3600, size_mb=args.cache_size_mb)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        provider = providers.configure(args.provider, args.api_url, args.hedge_after)
+    except ValueError as e:
+        parser.error(str(e))
+    required = ("REPOSITORY", "ISSUE_NUMBER", "OPENAI_API_KEY") if provider.needs_key else ("REPOSITORY", "ISSUE_NUMBER")
+    missing = [name for name in required if not getattr(args, name)]
+    if missing:
+        parser.error(f"missing {', '.join(missing)}")
+    try:
+        engine.generate(args.GITHUB_TOKEN, args.REPOSITORY, args.ISSUE_NUMBER, args.OPENAI_API_KEY,
+                        cache=open_cache(args), **engine_options(args))
+    except engine.GenerationError as e:
+        print(e)
+        return 1
+    print("All files have been processed successfully.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
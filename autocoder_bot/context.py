@@ -0,0 +1,214 @@
+"""
+Repository context for the prompt, retrieved from an on-disk index of the checkout.
+
+The prompt used to contain only the issue body, so every run wrote whole files blind to what the
+repository already holds. The index splits every text file git knows about into chunks of lines
+and stores their term counts; at generation time the chunks that best match the issue (BM25)
+are added to the prompt until a token budget is used up, so the model can edit existing code.
+
+The index is a JSON file next to the generation cache, so the action's ``actions/cache`` step
+keeps it between runs. Only files whose blob changed since it was written are chunked again:
+``git ls-files -s`` gives the blob of every tracked file, ``git diff`` the ones edited since.
+
+    python -m autocoder_bot.context --query "add a health check endpoint"
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+from autocoder_bot.budget import count_tokens
+from autocoder_bot.cache import DEFAULT_PATH
+
+CHUNK_LINES = 40
+MAX_FILE_BYTES = 200 * 1024
+DEFAULT_TOKENS = 2000
+INDEX_VERSION = 1
+
+# BM25 parameters, the usual defaults
+K1 = 1.2
+B = 0.75
+
+TERM = re.compile(r"[A-Za-z][A-Za-z0-9]+|[0-9]+")
+CAMEL = re.compile(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])")
+
+
+def terms(text):
+    """Lower-cased words, with camelCase and snake_case identifiers split into their parts too."""
+    words = []
+    for word in TERM.findall(text):
+        words.append(word.lower())
+        parts = CAMEL.findall(word)
+        if len(parts) > 1:
+            words.extend(part.lower() for part in parts)
+    return [word for word in words if len(word) > 1]
+
+
+def git(root, *args):
+    return subprocess.run(["git", "-C", root, *args], check=True, capture_output=True).stdout
+
+
+def tracked_blobs(root):
+    """``{path: blob sha}`` of the files git tracks, with locally edited files marked as changed."""
+    blobs = {}
+    for line in git(root, "ls-files", "-s", "-z").split(b"\0"):
+        if line:
+            info, path = line.decode(errors="replace").split("\t", 1)
+            mode, sha, _ = info.split()
+            if mode != "160000":  # submodules have no content here
+                blobs[path] = sha
+    for path in git(root, "diff", "--name-only", "-z").decode(errors="replace").split("\0"):
+        if path in blobs:
+            blobs[path] = "modified"
+    return blobs
+
+
+def chunk_file(root, path):
+    try:
+        with open(os.path.join(root, path), "rb") as f:
+            data = f.read(MAX_FILE_BYTES + 1)
+    except OSError:
+        return []
+    if len(data) > MAX_FILE_BYTES or b"\0" in data:
+        return []
+    lines = data.decode(errors="replace").splitlines()
+    chunks = []
+    for start in range(0, len(lines), CHUNK_LINES):
+        text = "\n".join(lines[start:start + CHUNK_LINES])
+        # The path is part of what a chunk is about
+        counts = Counter(terms(path) + terms(text))
+        if counts:
+            chunks.append({"path": path, "start": start + 1, "end": start + len(lines[start:start + CHUNK_LINES]),
+                           "text": text, "terms": counts, "length": sum(counts.values())})
+    return chunks
+
+
+def default_index_path(root):
+    name = hashlib.sha1(os.path.abspath(root).encode()).hexdigest()[:12]
+    return os.path.join(DEFAULT_PATH, f"index-{name}.json")
+
+
+class RepoIndex:
+    def __init__(self, root=".", path=None):
+        self.root = root
+        self.path = path or default_index_path(root)
+        self.files = {}
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.files = data["files"]
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"version": INDEX_VERSION, "files": self.files}, f)
+        os.replace(temporary, self.path)
+
+    def update(self):
+        """Chunk the files that changed since the index was saved; return how many that was."""
+        blobs = tracked_blobs(self.root)
+        changed = [path for path, sha in blobs.items() if sha == "modified" or self.files.get(path, {}).get("sha") != sha]
+        for path in set(self.files) - set(blobs):
+            del self.files[path]
+        for path in changed:
+            self.files[path] = {"sha": blobs[path], "chunks": chunk_file(self.root, path)}
+        return len(changed)
+
+    def search(self, query):
+        """Every chunk with its BM25 score for the query, best first."""
+        query_terms = set(terms(query))
+        chunks = [chunk for entry in self.files.values() for chunk in entry["chunks"]]
+        if not chunks or not query_terms:
+            return []
+        average_length = sum(chunk["length"] for chunk in chunks) / len(chunks)
+        frequency = Counter(term for chunk in chunks for term in query_terms & chunk["terms"].keys())
+        scored = []
+        for chunk in chunks:
+            score = 0.0
+            for term in query_terms & chunk["terms"].keys():
+                idf = math.log(1 + (len(chunks) - frequency[term] + 0.5) / (frequency[term] + 0.5))
+                count = chunk["terms"][term]
+                score += idf * count * (K1 + 1) / (count + K1 * (1 - B + B * chunk["length"] / average_length))
+            if score > 0:
+                scored.append((score, chunk))
+        scored.sort(key=lambda item: -item[0])
+        return scored
+
+    def select(self, query, max_tokens=DEFAULT_TOKENS):
+        """The best matching chunks that fit in the budget, in file and line order."""
+        selected = []
+        used = 0
+        for _, chunk in self.search(query):
+            cost = count_tokens(chunk["text"]) + count_tokens(chunk["path"]) + 8
+            if used + cost > max_tokens:
+                continue
+            selected.append(chunk)
+            used += cost
+        return sorted(selected, key=lambda chunk: (chunk["path"], chunk["start"]))
+
+
+def format_context(chunks, output_dir):
+    """The context section of the prompt; ``output_dir`` is relative to the root of the index."""
+    if not chunks:
+        return ""
+    # Chunk paths are relative to the repository root, the answer's to the output directory
+    prefix = os.path.normpath(output_dir).replace(os.sep, "/").strip("/") + "/"
+    parts = [f"Existing code of the repository that may be relevant. Files generated before are shown by their "
+             f"path relative to {prefix}, the same paths you answer with; include one only if it has to change, "
+             f"with its complete new content. Files marked [read-only] are the rest of the repository: use them "
+             f"for reference and do not include them in the answer."]
+    for chunk in chunks:
+        lines = f"(lines {chunk['start']}-{chunk['end']})"
+        if chunk["path"].startswith(prefix):
+            parts.append(f"--- {chunk['path'][len(prefix):]} {lines}\n{chunk['text']}")
+        else:
+            parts.append(f"--- [read-only] {chunk['path']} {lines}\n{chunk['text']}")
+    return "\n\n".join(parts)
+
+
+def build_context(issue_body, root=".", index_path=None, max_tokens=DEFAULT_TOKENS, output_dir="autocoder-bot"):
+    """Update the index of ``root`` and return the context to add to the prompt."""
+    index = RepoIndex(root, index_path)
+    index.load()
+    try:
+        changed = index.update()
+    except (OSError, subprocess.CalledProcessError):
+        # Not a git checkout: generate without context, as before
+        return ""
+    if changed:
+        index.save()
+    return format_context(index.select(issue_body, max_tokens), os.path.relpath(output_dir, root))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m autocoder_bot.context",
+                                     description="Update the repository index and show what a query retrieves.")
+    parser.add_argument("root", nargs="?", default=".", help="the git checkout to index (default: .)")
+    parser.add_argument("--index", help="index file (default: under ~/.cache/autocoder-bot)")
+    parser.add_argument("--query", help="text to retrieve context for, e.g. an issue body")
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_TOKENS, help="default: %(default)s")
+    args = parser.parse_args(argv)
+
+    index = RepoIndex(args.root, args.index)
+    index.load()
+    changed = index.update()
+    index.save()
+    print(f"Indexed {changed} changed file(s), {len(index.files)} in total: {index.path}")
+    if args.query:
+        print(format_context(index.select(args.query, args.max_tokens), "autocoder-bot"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
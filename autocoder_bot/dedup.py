@@ -0,0 +1,98 @@
+"""
+Skipping events for an issue whose body has not changed since the last generation.
+
+Adding several labels at once, or opening an issue that already has the trigger label, starts
+several runs for the same issue. The workflow's concurrency group keeps only the newest run, and
+this module lets that run stop early when there is nothing new to generate:
+
+    python -m autocoder_bot.dedup check   # sets the step output skip=true|false
+    python -m autocoder_bot.dedup record  # after the pull request has been created
+
+``record`` leaves a comment on the issue holding the sha256 of the body it generated code for.
+``check`` compares the current body with it. A ``reopened`` event always generates again, since
+reopening is how a user asks for a new attempt.
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+from github import GithubException
+
+from autocoder_bot import engine
+
+MARKER = "<!-- autocoder-bot:body-sha256={} -->"
+MARKER_PATTERN = re.compile(r"<!-- autocoder-bot:body-sha256=([0-9a-f]{64}) -->")
+
+
+def body_hash(body):
+    # Editing an issue in the browser may switch its line endings
+    normalized = (body or "").replace("\r\n", "\n").strip()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def find_marker(issue):
+    """The bot comment holding the last generated body hash, and that hash."""
+    for comment in issue.get_comments():
+        match = MARKER_PATTERN.search(comment.body or "")
+        if match:
+            return comment, match.group(1)
+    return None, None
+
+
+def is_unchanged(issue):
+    _, recorded = find_marker(issue)
+    return recorded is not None and recorded == body_hash(issue.body)
+
+
+def record(issue):
+    body = (f"{MARKER.format(body_hash(issue.body))}\n"
+            f"AutoCoder generated code for the current description of this issue. "
+            f"Edit the description or reopen the issue to generate it again.")
+    comment, _ = find_marker(issue)
+    if comment is None:
+        issue.create_comment(body)
+    else:
+        comment.edit(body)
+
+
+def set_output(name, value):
+    path = os.getenv("GITHUB_OUTPUT")
+    if path:
+        with open(path, "a") as f:
+            f.write(f"{name}={value}\n")
+    print(f"{name}={value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m autocoder_bot.dedup",
+                                     description="Skip generating code twice for the same issue body.")
+    parser.add_argument("command", choices=("check", "record"))
+    for name in ("GITHUB_TOKEN", "REPOSITORY", "ISSUE_NUMBER"):
+        parser.add_argument(f"--{name.lower().replace('_', '-')}", dest=name, default=os.getenv(name),
+                            help=f"default: ${name}")
+    parser.add_argument("--event-action", default=os.getenv("EVENT_ACTION", ""),
+                        help="the action of the issues event (default: $EVENT_ACTION)")
+    args = parser.parse_args(argv)
+
+    try:
+        issue = engine.get_issue(args.GITHUB_TOKEN, args.REPOSITORY, args.ISSUE_NUMBER)
+        if args.command == "record":
+            record(issue)
+            return 0
+        skip = args.event_action != "reopened" and is_unchanged(issue)
+    except GithubException as e:
+        # Never block a generation because the bookkeeping failed
+        print(f"Could not read or update the generation marker: {e}")
+        if args.command == "check":
+            set_output("skip", "false")
+        return 0
+    if skip:
+        print(f"The body of issue #{args.ISSUE_NUMBER} has not changed since code was last generated for it.")
+    set_output("skip", "true" if skip else "false")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
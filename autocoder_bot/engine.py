@@ -0,0 +1,240 @@
+"""
+Issue-to-files generation in one process.
+
+``scripts/script.sh`` fetches the issue with ``curl``, builds the messages with ``jq``, calls the
+chat completions API with ``curl`` again and then runs ``jq`` and ``sed`` once per generated file,
+so an answer with dozens of files spawns hundreds of processes. Here the issue is read with
+PyGithub, the completion is requested over one keep-alive ``requests`` session, the answer is
+parsed once and every file is written in a single pass, to the same ``autocoder-bot/<path>``
+locations and with the same messages as the script.
+"""
+import json
+import os
+import threading
+import time
+
+INSTRUCTIONS = (
+    "Based on the description below, please generate a JSON object where the keys represent file paths and "
+    "the values are the corresponding code snippets for a production-ready application. The response should "
+    "be a valid strictly JSON object without any additional formatting, markdown, or characters outside the "
+    "JSON structure."
+)
+OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
+MODEL = "gpt-3.5-turbo"
+MAX_TOKENS = 300
+OUTPUT_DIR = "autocoder-bot"
+# Seconds to wait for the completion; the script's curl waited forever
+TIMEOUT = 300
+# Connections kept alive to the API; enough for the planner's concurrent file requests
+POOL_SIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class GenerationError(Exception):
+    """A failure that ends the run with a message in the job log, like the exits of script.sh."""
+
+
+def get_session():
+    """The process-wide HTTP session, so every model call reuses the same connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                session = requests.Session()
+                session.headers["Content-Type"] = "application/json"
+                adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_repository(github_token, repository):
+    # PyGithub takes a noticeable part of the start-up to import, so only when GitHub is called
+    from github import Auth, Consts, Github
+    # Inside Actions GITHUB_API_URL also points at GitHub Enterprise servers
+    github = Github(auth=Auth.Token(github_token) if github_token else None,
+                    base_url=os.getenv("GITHUB_API_URL", Consts.DEFAULT_BASE_URL))
+    return github.get_repo(repository, lazy=True)
+
+
+def get_issue(github_token, repository, issue_number):
+    return get_repository(github_token, repository).get_issue(int(issue_number))
+
+
+def fetch_issue_body(github_token, repository, issue_number):
+    from github import GithubException
+    started = os.getenv("AUTOCODER_STARTED_AT")
+    if started:
+        print(f"First API call {time.time() - float(started):.2f}s after the engine was started.")
+    try:
+        body = get_issue(github_token, repository, issue_number).body
+    except GithubException:
+        body = None
+    if not body:
+        raise GenerationError("Issue body is empty or not found in the response.")
+    return body
+
+
+def build_prompt(issue_body, instructions=INSTRUCTIONS):
+    return f"{instructions}\n\n{issue_body}"
+
+
+def send_prompt(prompt, api_key, model=MODEL, max_tokens=MAX_TOKENS):
+    """Ask the chat completions API and return its decoded JSON answer."""
+    return send_messages([{"role": "user", "content": prompt}], api_key, model=model, max_tokens=max_tokens)
+
+
+def send_messages(messages, api_key, model=MODEL, max_tokens=MAX_TOKENS):
+    import requests
+
+    from autocoder_bot.providers import get_provider
+    payload = {"model": model, "messages": messages, "max_tokens": max_tokens}
+    try:
+        response = get_provider().post(payload, api_key)
+        answer = response.json()
+    except (requests.RequestException, ValueError):
+        raise GenerationError("No response received from the OpenAI API.")
+    if not response.ok:
+        message = answer.get("error", {}).get("message") if isinstance(answer, dict) else None
+        raise GenerationError(f"The OpenAI API returned an error: {message or response.status_code}")
+    return answer
+
+
+def message_content(answer):
+    try:
+        return answer["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def extract_files(answer):
+    """The ``{path: code}`` object the model was asked for, parsed once."""
+    try:
+        files = json.loads(message_content(answer))
+    except (TypeError, ValueError):
+        files = None
+    if not isinstance(files, dict) or not files:
+        raise GenerationError("No valid JSON dictionary found in the response or the response was not valid JSON. "
+                              "Please rerun the job.")
+    return files
+
+
+def normalize(code_snippet):
+    """The file content as the script writes it: LF line endings and one final newline."""
+    if not isinstance(code_snippet, str):
+        # jq -r prints nested values as JSON
+        code_snippet = json.dumps(code_snippet, indent=2)
+    lines = code_snippet.rstrip("\n").split("\n")
+    return "\n".join(line[:-1] if line.endswith("\r") else line for line in lines) + "\n"
+
+
+def output_path(output_dir, filename):
+    """Where a generated file goes, refusing paths that would leave the output directory."""
+    root = os.path.abspath(output_dir)
+    path = os.path.abspath(os.path.join(root, filename))
+    if os.path.isabs(filename) or os.path.commonpath([root, path]) != root or path == root:
+        raise GenerationError(f"Refusing to write outside {output_dir}: {filename}")
+    return path
+
+
+def write_file(output_dir, filename, code_snippet, path=None):
+    path = path or output_path(output_dir, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="\n") as f:
+        f.write(normalize(code_snippet))
+    written = os.path.join(output_dir, filename)
+    print(f"The code has been written to {written}")
+    return written
+
+
+def write_files(files, output_dir=OUTPUT_DIR):
+    """Write every generated file and return their paths, in the order the script writes them."""
+    # Check every path first, so a bad one leaves nothing half written
+    paths = {filename: output_path(output_dir, filename) for filename in sorted(files)}
+    return [write_file(output_dir, filename, files[filename], path) for filename, path in paths.items()]
+
+
+def generate(github_token, repository, issue_number, api_key, output_dir=OUTPUT_DIR, model=MODEL,
+             max_tokens=None, stream=False, plan=False, patch=False, workers=None, cache=None,
+             context_root=None, context_tokens=None, context_dir=None, budget=True, recover=True, validate=True):
+    """Generate the files of an issue and return them as ``{path: code}``.
+
+    ``stream`` writes files while the completion arrives (``autocoder_bot.streaming``), ``plan``
+    generates every file with its own request (``autocoder_bot.planner``), ``cache`` reuses the
+    files of an identical earlier prompt (``autocoder_bot.cache``) and ``context_root`` adds the
+    most relevant code of that checkout to the prompt (``autocoder_bot.context``), showing the files
+    under ``context_dir`` (by default ``output_dir``) as the ones generated before. ``patch`` asks
+    for diffs against that code instead of whole files (``autocoder_bot.patches``). ``budget``
+    compacts the issue and sizes ``max_tokens`` when it is not given (``autocoder_bot.budget``),
+    ``recover`` repairs a malformed or cut off answer with follow-up requests (``autocoder_bot.recovery``)
+    and ``validate`` checks the syntax of the written files and asks again for the broken ones
+    (``autocoder_bot.validation``).
+    """
+    issue_body = fetch_issue_body(github_token, repository, issue_number)
+    if budget:
+        from autocoder_bot import budget as budgeting
+        issue_body = budgeting.compact(issue_body)
+        files_expected = budgeting.expected_files(issue_body)
+    writer = write_files
+    if patch:
+        from autocoder_bot import patches
+        writer = patches.apply_files
+        # The model can only write diffs against code it has seen
+        context_root = context_root or "."
+    if context_root:
+        from autocoder_bot import context
+        repository_context = context.build_context(issue_body, context_root, output_dir=context_dir or output_dir,
+                                                   max_tokens=context_tokens or context.DEFAULT_TOKENS)
+        if repository_context:
+            # Everything below works on the description, so the context reaches every mode and the cache key
+            issue_body = f"{repository_context}\n\n{issue_body}"
+    if plan:
+        from autocoder_bot import planner
+        instructions = f"{planner.PLAN_INSTRUCTIONS}\n{planner.FILE_INSTRUCTIONS}"
+        max_tokens = max_tokens or planner.FILE_MAX_TOKENS
+    else:
+        instructions = patches.INSTRUCTIONS if patch else INSTRUCTIONS
+        if max_tokens is None and budget:
+            prompt_tokens = budgeting.count_tokens(build_prompt(issue_body, instructions))
+            max_tokens = budgeting.plan_output(build_prompt(issue_body, instructions), model, files_expected)
+            if max_tokens < budgeting.MIN_OUTPUT_TOKENS:
+                raise GenerationError(f"The issue is too long for {model}: its prompt takes about {prompt_tokens} "
+                                      f"tokens. Please shorten the issue description.")
+            print(f"Prompt of about {prompt_tokens} tokens, allowing {max_tokens} tokens for the answer.")
+        max_tokens = max_tokens or MAX_TOKENS
+
+    if cache is not None:
+        from autocoder_bot.cache import cache_key
+        key = cache_key(instructions, issue_body, model=model, max_tokens=max_tokens, plan=plan)
+        files = cache.get(key)
+        if files is not None:
+            print("Reusing the code generated for an identical issue body and prompt.")
+            writer(files, output_dir)
+            return files
+
+    if plan:
+        files = planner.generate_planned(issue_body, api_key, output_dir=output_dir, model=model,
+                                         max_tokens=max_tokens, workers=workers or planner.WORKERS)
+    elif stream:
+        from autocoder_bot.streaming import generate_streaming
+        files = generate_streaming(build_prompt(issue_body), api_key, output_dir=output_dir, model=model,
+                                   max_tokens=max_tokens)
+    else:
+        prompt = build_prompt(issue_body, instructions)
+        answer = send_prompt(prompt, api_key, model=model, max_tokens=max_tokens)
+        if recover:
+            from autocoder_bot.recovery import recover_files
+            files = recover_files(prompt, answer, api_key, model=model, max_tokens=max_tokens)
+        else:
+            files = extract_files(answer)
+        writer(files, output_dir)
+    if validate:
+        from autocoder_bot.validation import validate_files
+        files = validate_files(issue_body, files, api_key, output_dir=output_dir, model=model, max_tokens=max_tokens)
+    if cache is not None:
+        cache.put(key, files)
+    return files
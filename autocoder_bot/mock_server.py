@@ -0,0 +1,171 @@
+"""
+Local stand-in for the chat completions API, for runs and load tests without an API key.
+
+    python -m autocoder_bot.mock_server --fixtures answers.json --latency 0.2
+    python -m autocoder_bot --provider mock '' learner/autocoder 1
+    python -m autocoder_bot.mock_server --load-test 500 --concurrency 16
+
+Answers are deterministic. ``--fixtures`` is a JSON object mapping a piece of text to the
+content answered to any prompt containing it, checked in order; other prompts get a default answer
+of the shape they ask for: a ``{path: code}`` object, the planner's JSON array of paths, or the
+content of one file. ``stream: true`` requests are answered with server-sent events, a few
+characters per event. ``--latency`` delays every answer, so timeouts and hedging can be tried out.
+``--load-test`` serves on a free port, sends that many requests through the engine's provider and
+reports the throughput.
+"""
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_FILES = {
+    "README.md": "# Generated application\n\nGenerated by the autocoder-bot mock model server.\n",
+    "main.py": 'def main():\n    print("Hello from autocoder-bot")\n\n\nif __name__ == "__main__":\n    main()\n',
+}
+STREAM_CHUNK = 16
+
+FILE_PROMPT = re.compile(r"write the complete content of the file (\S+) of")
+
+
+def default_answer(prompt):
+    match = FILE_PROMPT.search(prompt)
+    if match:
+        return DEFAULT_FILES.get(match.group(1), f"# {match.group(1)}\n")
+    if "JSON array" in prompt:
+        return json.dumps(list(DEFAULT_FILES))
+    return json.dumps(DEFAULT_FILES)
+
+
+class MockModel:
+    def __init__(self, fixtures=None, latency=0.0):
+        self.fixtures = fixtures or {}
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def answer(self, payload):
+        with self._lock:
+            self.requests += 1
+        prompt = "\n".join(message.get("content") or "" for message in payload.get("messages", [])
+                           if message.get("role") == "user")
+        for text, content in self.fixtures.items():
+            if text in prompt:
+                return content
+        return default_answer(prompt)
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle each keep-alive answer waits for a delayed ACK
+    disable_nagle_algorithm = True
+    model = None
+
+    def do_POST(self):
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        except ValueError:
+            return self.send_json(400, {"error": {"message": "The request body is not valid JSON."}})
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self.send_json(404, {"error": {"message": f"Unknown endpoint {self.path}"}})
+        content = self.model.answer(payload)
+        if self.model.latency:
+            time.sleep(self.model.latency)
+        if payload.get("stream"):
+            return self.send_events(content)
+        self.send_json(200, {"object": "chat.completion", "model": payload.get("model"),
+                             "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                          "finish_reason": "stop"}]})
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_events(self, content):
+        # No length is known up front, so the end of the stream is the end of the connection
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for start in range(0, len(content), STREAM_CHUNK):
+            event = {"choices": [{"index": 0, "delta": {"content": content[start:start + STREAM_CHUNK]}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(model, host="127.0.0.1", port=0):
+    """Start the stand-in server on a background thread and return it with its completions URL."""
+    handler = type("Handler", (MockRequestHandler,), {"model": model})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.request_queue_size = 128
+    threading.Thread(target=server.serve_forever, daemon=True, name="mock-model").start()
+    return server, f"http://{host}:{server.server_address[1]}/v1/chat/completions"
+
+
+def load_test(url, requests, concurrency):
+    """Send ``requests`` completions with ``concurrency`` threads; return the latencies in seconds."""
+    from autocoder_bot.providers import Provider
+
+    provider = Provider("mock", url)
+    payload = {"model": "mock", "messages": [{"role": "user", "content": "Load test"}], "max_tokens": 300}
+
+    def one(_):
+        started = time.perf_counter()
+        response = provider.post(payload, None)
+        response.json()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(requests)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m autocoder_bot.mock_server",
+                                     description="Serve a deterministic stand-in for the chat completions API.")
+    parser.add_argument("--fixtures", help="JSON object of {text in the prompt: answer content}")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before every answer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--load-test", type=int, metavar="REQUESTS",
+                        help="serve on a free port, send this many requests and report the throughput")
+    parser.add_argument("--concurrency", type=int, default=16, help="threads of the load test (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    fixtures = None
+    if args.fixtures:
+        with open(args.fixtures) as f:
+            fixtures = json.load(f)
+    model = MockModel(fixtures, args.latency)
+    if args.load_test:
+        server, url = serve(model, args.host)
+        started = time.perf_counter()
+        latencies = sorted(load_test(url, args.load_test, args.concurrency))
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+        print(f"{len(latencies)} requests in {elapsed:.2f}s with {args.concurrency} threads: "
+              f"{len(latencies) / elapsed:.0f} requests/s, median {latencies[len(latencies) // 2] * 1000:.1f}ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms")
+        return 0
+    server, url = serve(model, args.host, args.port)
+    print(f"Serving the chat completions stand-in at {url}, use --provider mock or --api-url {url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
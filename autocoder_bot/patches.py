@@ -0,0 +1,128 @@
+"""
+Patch mode: the model answers with unified diffs, applied here with conflict detection.
+
+Writing whole files makes the model repeat every unchanged line, and every regenerated file shows
+up as rewritten in the pull request. In patch mode the prompt asks for ``{path: diff}`` against
+the existing files under ``autocoder-bot/`` (shown to the model through the repository context,
+see ``autocoder_bot.context``). Every hunk must find its context and removed lines in the current
+file, at the line it names or elsewhere; if one does not, nothing is written and the conflicting
+files are reported. A value that is not a diff is the complete content of a new file.
+"""
+import os
+import re
+
+from autocoder_bot import engine
+
+INSTRUCTIONS = (
+    "Based on the description below, change the existing code shown above. Please generate a JSON object where "
+    "the keys are file paths and the values are unified diffs, with @@ hunk headers and three lines of context, "
+    "against the current content of those files; for a new file, the value is its complete content. The response "
+    "should be a valid strictly JSON object without any additional formatting, markdown, or characters outside "
+    "the JSON structure."
+)
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchConflict(Exception):
+    pass
+
+
+class Hunk:
+    def __init__(self, old_start):
+        self.old_start = old_start
+        self.lines = []
+
+    @property
+    def old(self):
+        return [text for op, text in self.lines if op in " -"]
+
+    @property
+    def new(self):
+        return [text for op, text in self.lines if op in " +"]
+
+
+def is_diff(text):
+    return isinstance(text, str) and any(HUNK_HEADER.match(line) for line in text.splitlines())
+
+
+def parse_hunks(diff):
+    hunks = []
+    for line in diff.splitlines():
+        header = HUNK_HEADER.match(line)
+        if header:
+            hunks.append(Hunk(int(header.group(1))))
+        elif not hunks or line.startswith("\\"):
+            # File headers before the first hunk, "\ No newline at end of file" markers
+            continue
+        elif line == "":
+            # Models drop the space of empty context lines
+            hunks[-1].lines.append((" ", ""))
+        elif line[0] in " -+":
+            hunks[-1].lines.append((line[0], line[1:]))
+        else:
+            raise PatchConflict(f"unexpected line in hunk {len(hunks)}: {line[:40]!r}")
+    return hunks
+
+
+def _matches(lines, start, old, strict):
+    if strict:
+        return lines[start:start + len(old)] == old
+    return [line.rstrip() for line in lines[start:start + len(old)]] == [line.rstrip() for line in old]
+
+
+def find_hunk(lines, old, hint, first):
+    """Where ``old`` starts in ``lines``, trying the line the hunk names first, then the nearest match."""
+    last = len(lines) - len(old)
+    if not old:
+        return min(max(hint, first), len(lines))
+    candidates = sorted(range(first, last + 1), key=lambda start: abs(start - hint))
+    for strict in (True, False):
+        for start in candidates:
+            if _matches(lines, start, old, strict):
+                return start
+    return None
+
+
+def apply_patch(original, diff):
+    """The content of ``original`` once ``diff`` is applied; raise PatchConflict if a hunk does not fit."""
+    lines = original.splitlines()
+    hunks = parse_hunks(diff)
+    if not hunks:
+        raise PatchConflict("no hunks found")
+    result = []
+    position = 0
+    for number, hunk in enumerate(hunks, 1):
+        start = find_hunk(lines, hunk.old, max(hunk.old_start - 1, 0), position)
+        if start is None:
+            raise PatchConflict(f"hunk {number} (@@ -{hunk.old_start}) does not match the current file")
+        result.extend(lines[position:start])
+        result.extend(hunk.new)
+        position = start + len(hunk.old)
+    result.extend(lines[position:])
+    return "\n".join(result) + "\n"
+
+
+def apply_files(files, output_dir=engine.OUTPUT_DIR):
+    """Apply every diff, or write the new files, only if no file conflicts."""
+    contents = {}
+    conflicts = []
+    for filename in sorted(files):
+        path = engine.output_path(output_dir, filename)
+        value = files[filename]
+        if not is_diff(value):
+            contents[filename] = (path, value)
+            continue
+        try:
+            with open(path) as f:
+                original = f.read()
+        except FileNotFoundError:
+            original = ""
+        try:
+            contents[filename] = (path, apply_patch(original, value))
+        except PatchConflict as e:
+            conflicts.append(f"{os.path.join(output_dir, filename)}: {e}")
+    if conflicts:
+        raise engine.GenerationError("The changes could not be applied:\n" + "\n".join(conflicts)
+                                     + "\nPlease rerun the job.")
+    return [engine.write_file(output_dir, filename, content, path) for filename, (path, content) in contents.items()]
@@ -0,0 +1,88 @@
+"""
+Planner mode: one short call for the file list, then one call per file, concurrently.
+
+Asking for a whole project in a single completion truncates large answers, which then fail to
+parse. The planner first asks only for the paths of the files the issue needs, then requests
+every file body on its own from a bounded thread pool sharing the engine's HTTP session. Each
+file is written to ``autocoder-bot/<path>`` as soon as its request returns, so a large issue
+takes about as long as its slowest file.
+"""
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from autocoder_bot import engine
+
+WORKERS = 4
+PLAN_MAX_TOKENS = 300
+FILE_MAX_TOKENS = 1024
+MAX_FILES = 50
+
+PLAN_INSTRUCTIONS = (
+    "Based on the description below, list the files of a production-ready application that implements it. "
+    "The response should be a valid strictly JSON array of relative file paths without any additional "
+    "formatting, markdown, or characters outside the JSON structure."
+)
+FILE_INSTRUCTIONS = (
+    "Based on the description below, write the complete content of the file {path} of a production-ready "
+    "application made of these files: {paths}. The response should be only the content of {path}, without "
+    "any additional formatting, markdown, or explanations."
+)
+
+FENCE = re.compile(r"^\s*```[^\n]*\n(.*?)\n?```\s*$", re.DOTALL)
+
+
+def strip_fence(content):
+    """Drop the markdown code fence models tend to wrap a single file in."""
+    match = FENCE.match(content)
+    return match.group(1) if match else content
+
+
+def plan_files(issue_body, api_key, model=engine.MODEL, max_tokens=PLAN_MAX_TOKENS):
+    answer = engine.send_prompt(f"{PLAN_INSTRUCTIONS}\n\n{issue_body}", api_key, model=model,
+                                max_tokens=max_tokens)
+    try:
+        paths = json.loads(strip_fence(engine.message_content(answer) or ""))
+    except ValueError:
+        paths = None
+    if isinstance(paths, dict):
+        paths = list(paths)
+    if not isinstance(paths, list) or not paths or not all(isinstance(path, str) and path for path in paths):
+        raise engine.GenerationError("No valid JSON list of files found in the response. Please rerun the job.")
+    # Keep the model's order but drop repeated paths
+    return list(dict.fromkeys(paths))[:MAX_FILES]
+
+
+def generate_file(issue_body, path, paths, api_key, model=engine.MODEL, max_tokens=FILE_MAX_TOKENS):
+    instructions = FILE_INSTRUCTIONS.format(path=path, paths=", ".join(paths))
+    answer = engine.send_prompt(f"{instructions}\n\n{issue_body}", api_key, model=model, max_tokens=max_tokens)
+    content = engine.message_content(answer)
+    if not isinstance(content, str):
+        raise engine.GenerationError(f"No content received for {path}.")
+    return strip_fence(content)
+
+
+def generate_planned(issue_body, api_key, output_dir=engine.OUTPUT_DIR, model=engine.MODEL,
+                     max_tokens=FILE_MAX_TOKENS, workers=WORKERS):
+    """Plan the files, generate them concurrently and return them."""
+    paths = plan_files(issue_body, api_key, model=model)
+    # Refuse a bad path before paying for any file
+    targets = {path: engine.output_path(output_dir, path) for path in paths}
+    files = {}
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="planner") as executor:
+        futures = {executor.submit(generate_file, issue_body, path, paths, api_key, model, max_tokens): path
+                   for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                content = future.result()
+            except engine.GenerationError as e:
+                print(e)
+                failed.append(path)
+                continue
+            engine.write_file(output_dir, path, content, targets[path])
+            files[path] = content
+    if failed:
+        raise engine.GenerationError(f"Could not generate {', '.join(sorted(failed))}. Please rerun the job.")
+    return files
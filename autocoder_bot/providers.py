@@ -0,0 +1,119 @@
+"""
+Model providers: where completions are requested and how a slow or failed call is retried.
+
+The chat completions endpoint used to be hard-coded. A provider is an endpoint speaking the
+OpenAI chat completions protocol: ``openai``, ``mock`` (the local stand-in of
+``autocoder_bot.mock_server``) or any compatible server given by URL. Every call goes through the
+engine's keep-alive session (``requests`` has no HTTP/2, but the pooled HTTP/1.1 connections
+already save the handshake of every call after the first). On top of that:
+
+- separate connect and read timeouts, so an unreachable host fails in seconds;
+- retries with exponential backoff on connection errors, 429 and 5xx, honouring ``Retry-After``;
+- optional hedging: if no response has arrived after ``hedge_after`` seconds, the same request
+  is sent a second time and whichever answers first is used. It cuts the tail latency of slow
+  calls at the price of the occasional duplicate request, so it is off unless configured.
+
+The provider is chosen with ``--provider``/``--api-url``/``--hedge-after`` or the
+``AUTOCODER_PROVIDER``, ``AUTOCODER_API_URL`` and ``AUTOCODER_HEDGE_AFTER`` variables.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import requests
+
+from autocoder_bot import engine
+
+MOCK_API_URL = "http://127.0.0.1:8787/v1/chat/completions"
+PROVIDERS = {"openai": engine.OPENAI_API_URL, "mock": MOCK_API_URL}
+CONNECT_TIMEOUT = 10
+MAX_ATTEMPTS = 3
+BACKOFF = 1.0
+MAX_BACKOFF = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_provider = None
+_provider_lock = threading.Lock()
+_hedges = ThreadPoolExecutor(max_workers=engine.POOL_SIZE, thread_name_prefix="hedge")
+
+
+class Provider:
+    def __init__(self, name="openai", url=None, timeout=engine.TIMEOUT, hedge_after=None, attempts=MAX_ATTEMPTS):
+        if url is None and name not in PROVIDERS:
+            raise ValueError(f"Unknown provider {name!r}, expected one of {', '.join(PROVIDERS)} or an API URL")
+        self.name = name
+        self.url = url or PROVIDERS[name]
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.attempts = attempts
+
+    @property
+    def needs_key(self):
+        return self.name != "mock"
+
+    def _send(self, payload, api_key, stream):
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        return engine.get_session().post(self.url, json=payload, headers=headers, stream=stream,
+                                         timeout=(CONNECT_TIMEOUT, self.timeout))
+
+    def _send_hedged(self, payload, api_key, stream):
+        if not self.hedge_after:
+            return self._send(payload, api_key, stream)
+        first = _hedges.submit(self._send, payload, api_key, stream)
+        try:
+            return first.result(timeout=self.hedge_after)
+        except FutureTimeoutError:
+            pass
+        pending = {first, _hedges.submit(self._send, payload, api_key, stream)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The slower request is not needed any more; free its connection when it answers
+                    for other in pending:
+                        other.add_done_callback(lambda f: f.exception() is None and f.result().close())
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def post(self, payload, api_key, stream=False):
+        """Send a chat completions request and return the ``requests.Response``."""
+        for attempt in range(1, max(1, self.attempts) + 1):
+            last = attempt >= self.attempts
+            try:
+                response = self._send_hedged(payload, api_key, stream)
+            except requests.RequestException:
+                if last:
+                    raise
+                time.sleep(backoff(attempt))
+                continue
+            if response.status_code not in RETRY_STATUSES or last:
+                return response
+            response.close()
+            time.sleep(backoff(attempt, response.headers.get("Retry-After")))
+
+
+def backoff(attempt, retry_after=None):
+    try:
+        return min(float(retry_after), MAX_BACKOFF)
+    except (TypeError, ValueError):
+        return min(BACKOFF * 2 ** (attempt - 1), MAX_BACKOFF)
+
+
+def configure(name=None, url=None, hedge_after=None):
+    """Select the provider of this process; arguments left out come from the environment."""
+    global _provider
+    hedge_after = hedge_after if hedge_after is not None else os.getenv("AUTOCODER_HEDGE_AFTER")
+    provider = Provider(name or os.getenv("AUTOCODER_PROVIDER") or "openai",
+                        url or os.getenv("AUTOCODER_API_URL") or None,
+                        hedge_after=float(hedge_after) if hedge_after else None)
+    with _provider_lock:
+        _provider = provider
+    return provider
+
+
+def get_provider():
+    return _provider or configure()
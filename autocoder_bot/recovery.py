@@ -0,0 +1,75 @@
+"""
+Recovery of model answers that are not the clean JSON object the prompt asks for.
+
+``script.sh`` gives up with "Please rerun the job" whenever ``fromjson`` fails, which costs a
+whole new workflow run. Most failures are an answer wrapped in a markdown fence or preceded by a
+sentence, or an answer cut off by ``max_tokens``. The answer is read from its first ``{`` with the
+incremental parser of ``autocoder_bot.streaming``, which keeps every complete ``path: code`` entry
+and stops at the end of the object. If the answer was cut off, the model is asked to continue it
+from where it stopped; if it is malformed, it is asked for the files that are still missing. Both
+are small requests compared with a new run. What could be recovered is written even if the
+answer stays incomplete.
+"""
+from autocoder_bot import engine
+from autocoder_bot.streaming import FileObjectParser
+
+MAX_REPAIRS = 2
+
+CONTINUE = ("Your answer was cut off. Continue the JSON object exactly where it stopped, without repeating "
+            "anything and without any additional formatting or characters.")
+REMAINING = ("These files are already done: {files}. Generate a JSON object with only the remaining files, "
+             "in the same format.")
+
+
+def strip_fence_line(text):
+    """Drop a leading ```json line a model puts before a continuation."""
+    stripped = text.lstrip()
+    if stripped.startswith("```"):
+        return stripped.split("\n", 1)[1] if "\n" in stripped else ""
+    return text
+
+
+def parse_into(parser, text, files):
+    """Feed ``text`` to the parser and collect the entries; False if the text is not valid JSON."""
+    try:
+        for filename, code_snippet in parser.iter_feed(text):
+            files[filename] = code_snippet
+    except ValueError:
+        return False
+    return True
+
+
+def start_parsing(content, files):
+    parser = FileObjectParser()
+    start = content.find("{")
+    received = content[start:] if start >= 0 else ""
+    valid = start >= 0 and parse_into(parser, received, files)
+    return parser, received, valid
+
+
+def recover_files(prompt, answer, api_key, model=engine.MODEL, max_tokens=engine.MAX_TOKENS):
+    """The ``{path: code}`` object of an answer, repaired with follow-up requests where needed."""
+    files = {}
+    parser, received, valid = start_parsing(engine.message_content(answer) or "", files)
+    for _ in range(MAX_REPAIRS):
+        if parser.done:
+            break
+        if valid and received:
+            print(f"The answer was cut off after {len(files)} complete file(s), asking for the rest of it.")
+            messages = [{"role": "user", "content": prompt}, {"role": "assistant", "content": received},
+                        {"role": "user", "content": CONTINUE}]
+            answer = engine.send_messages(messages, api_key, model=model, max_tokens=max_tokens)
+            rest = strip_fence_line(engine.message_content(answer) or "")
+            received += rest
+            valid = parse_into(parser, rest, files)
+        else:
+            print(f"The answer was not valid JSON after {len(files)} complete file(s), asking for the missing files.")
+            follow_up = f"{prompt}\n\n{REMAINING.format(files=', '.join(sorted(files)))}" if files else prompt
+            answer = engine.send_prompt(follow_up, api_key, model=model, max_tokens=max_tokens)
+            parser, received, valid = start_parsing(engine.message_content(answer) or "", files)
+    if not files:
+        raise engine.GenerationError("No valid JSON dictionary found in the response or the response was not valid JSON. "
+                                     "Please rerun the job.")
+    if not parser.done:
+        print(f"The answer stayed incomplete, writing the {len(files)} complete file(s) recovered from it.")
+    return files
@@ -0,0 +1,181 @@
+"""
+Streaming generation: files are written while the completion is still arriving.
+
+Without streaming the whole answer is awaited and parsed at once, so a large generation is a long
+stall followed by an all-or-nothing parse. With ``stream: true`` the chat completions API sends
+the answer as server-sent events; their content is fed to ``FileObjectParser``, which walks the
+``{path: code}`` object one character at a time and hands back every entry as soon as its value
+is complete. Only the entry being parsed is kept in memory.
+"""
+import json
+
+import requests
+
+from autocoder_bot import engine
+from autocoder_bot.providers import get_provider
+
+WHITESPACE = " \t\r\n"
+
+
+class FileObjectParser:
+    """Incremental parser for a JSON object, yielding its ``(key, value)`` pairs one by one."""
+
+    def __init__(self):
+        self.state = "start"
+        self.done = False
+        self.key = None
+        self._buffer = []
+        self._in_string = False
+        self._escaped = False
+        self._depth = 0
+
+    def feed(self, text):
+        """Parse the next chunk and return the entries it completed; text after the object is ignored."""
+        return list(self.iter_feed(text))
+
+    def iter_feed(self, text):
+        """Like ``feed``, but yield each entry as it completes, so those before a syntax error are kept."""
+        for char in text:
+            if self.done:
+                break
+            entry = self._step(char)
+            if entry is not None:
+                yield entry
+
+    def _fail(self, char):
+        raise ValueError(f"Unexpected {char!r} while expecting {self.state.replace('_', ' ')}")
+
+    def _step(self, char):
+        state = self.state
+        if state in ("start", "key_or_end", "key", "colon", "value", "comma_or_end"):
+            if char in WHITESPACE:
+                return None
+        if state == "start":
+            if char != "{":
+                self._fail(char)
+            self.state = "key_or_end"
+        elif state in ("key_or_end", "key"):
+            if char == "}" and state == "key_or_end":
+                self.state, self.done = "end", True
+            elif char == '"':
+                self._buffer = [char]
+                self.state = "in_key"
+            else:
+                self._fail(char)
+        elif state == "in_key":
+            self._buffer.append(char)
+            if self._string_closed(char):
+                self.key = json.loads("".join(self._buffer))
+                self.state = "colon"
+        elif state == "colon":
+            if char != ":":
+                self._fail(char)
+            self.state = "value"
+        elif state == "value":
+            if char in ",:]}":
+                self._fail(char)
+            self._buffer = [char]
+            self._in_string = char == '"'
+            self._depth = 1 if char in "{[" else 0
+            self.state = "in_value"
+        elif state == "in_value":
+            return self._step_value(char)
+        elif state == "comma_or_end":
+            if char == ",":
+                self.state = "key"
+            elif char == "}":
+                self.state, self.done = "end", True
+            else:
+                self._fail(char)
+        return None
+
+    def _string_closed(self, char):
+        if self._escaped:
+            self._escaped = False
+        elif char == "\\":
+            self._escaped = True
+        elif char == '"':
+            return True
+        return False
+
+    def _step_value(self, char):
+        if self._in_string:
+            self._buffer.append(char)
+            if not self._string_closed(char):
+                return None
+            self._in_string = False
+            if self._depth:
+                return None
+            return self._complete("comma_or_end")
+        if self._depth:
+            self._buffer.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if not self._depth:
+                    return self._complete("comma_or_end")
+            return None
+        # A number or literal ends at the delimiter that follows it
+        if char in WHITESPACE + ",}":
+            entry = self._complete("comma_or_end")
+            self._step(char)
+            return entry
+        self._buffer.append(char)
+        return None
+
+    def _complete(self, next_state):
+        value = json.loads("".join(self._buffer))
+        self._buffer = []
+        self.state = next_state
+        return self.key, value
+
+
+def stream_content(prompt, api_key, model=engine.MODEL, max_tokens=engine.MAX_TOKENS):
+    """Yield the pieces of the completion's content as the API streams them."""
+    payload = {"model": model, "messages": [{"role": "user", "content": prompt}], "max_tokens": max_tokens,
+               "stream": True}
+    try:
+        response = get_provider().post(payload, api_key, stream=True)
+    except requests.RequestException:
+        raise engine.GenerationError("No response received from the OpenAI API.")
+    with response:
+        if not response.ok:
+            try:
+                message = response.json().get("error", {}).get("message")
+            except ValueError:
+                message = None
+            raise engine.GenerationError(f"The OpenAI API returned an error: {message or response.status_code}")
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or [{}]
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    yield content
+        except (requests.RequestException, ValueError):
+            raise engine.GenerationError("The OpenAI API stream was interrupted. Please rerun the job.")
+
+
+def generate_streaming(prompt, api_key, output_dir=engine.OUTPUT_DIR, model=engine.MODEL,
+                       max_tokens=engine.MAX_TOKENS):
+    """Write each file as soon as the stream completes its entry and return the generated files."""
+    parser = FileObjectParser()
+    files = {}
+    try:
+        for content in stream_content(prompt, api_key, model=model, max_tokens=max_tokens):
+            for filename, code_snippet in parser.feed(content):
+                engine.write_file(output_dir, filename, code_snippet)
+                files[filename] = code_snippet
+    except ValueError:
+        parser.done = False
+    if not parser.done or not files:
+        raise engine.GenerationError("No valid JSON dictionary found in the response or the response was not valid "
+                                     "JSON. Please rerun the job.")
+    return files
@@ -0,0 +1,152 @@
+"""
+Validation of the generated files before they are committed, with a repair request for the broken ones.
+
+Whatever the model answers used to be written and committed as it is, so a syntax error only
+showed up once the pull request was open. The files written to ``autocoder-bot/`` are now parsed
+on a thread pool, one task per file: Python is compiled, JSON and YAML are loaded, JavaScript goes
+through ``node --check`` and shell scripts through ``bash -n`` when those are installed. Files
+that fail are sent back to the model with their errors, and only those files are asked for again.
+If some still fail after that, the run stops before the commit.
+
+Files of other types, and YAML without PyYAML installed, are not checked.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from autocoder_bot import engine
+
+MAX_REPAIRS = 1
+CHECK_TIMEOUT = 30
+MAX_ERROR_LINES = 5
+
+REPAIR = ("The files below were generated for the description above but do not pass a syntax check. Generate a "
+          "JSON object with only these files, corrected, where the keys are the same file paths and the values "
+          "their complete corrected content, without any additional formatting or characters outside the JSON "
+          "structure.")
+
+
+def check_python(filename, content):
+    try:
+        compile(content, filename, "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        return f"line {getattr(e, 'lineno', None) or '?'}: {getattr(e, 'msg', None) or e}"
+    return None
+
+
+def check_json(filename, content):
+    try:
+        json.loads(content)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def check_yaml(filename, content):
+    try:
+        import yaml
+    except ImportError:
+        return None
+    try:
+        list(yaml.safe_load_all(content))
+    except yaml.YAMLError as e:
+        return str(e)
+    return None
+
+
+def check_command(command, filename, content):
+    """Run ``command`` on a temporary copy of the file; the error it prints, if it fails."""
+    if shutil.which(command[0]) is None:
+        return None
+    # Some checkers go by the extension, e.g. node for .mjs
+    with tempfile.NamedTemporaryFile("w", suffix=os.path.splitext(filename)[1], delete=False) as f:
+        f.write(content)
+    try:
+        result = subprocess.run([*command, f.name], capture_output=True, text=True, timeout=CHECK_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return None
+    finally:
+        os.unlink(f.name)
+    if result.returncode == 0:
+        return None
+    output = (result.stderr or result.stdout).replace(f.name, filename).strip()
+    return output or f"{command[0]} exited with {result.returncode}"
+
+
+CHECKS = {
+    ".py": check_python,
+    ".json": check_json,
+    ".yml": check_yaml,
+    ".yaml": check_yaml,
+    ".js": lambda filename, content: check_command(["node", "--check"], filename, content),
+    ".mjs": lambda filename, content: check_command(["node", "--check"], filename, content),
+    ".cjs": lambda filename, content: check_command(["node", "--check"], filename, content),
+    ".sh": lambda filename, content: check_command(["bash", "-n"], filename, content),
+    ".bash": lambda filename, content: check_command(["bash", "-n"], filename, content),
+}
+
+
+def check_file(filename, content):
+    """The syntax error of a file, or None if it parses or its type is not checked."""
+    check = CHECKS.get(os.path.splitext(filename)[1].lower())
+    error = check(filename, content) if check else None
+    return "\n".join(error.splitlines()[:MAX_ERROR_LINES]) if error else None
+
+
+def _check_path(filename, path):
+    with open(path) as f:
+        return check_file(filename, f.read())
+
+
+def validate(filenames, output_dir=engine.OUTPUT_DIR, workers=None):
+    """``{path: error}`` of the written files that fail their check."""
+    checked = [filename for filename in sorted(filenames) if os.path.splitext(filename)[1].lower() in CHECKS]
+    paths = [engine.output_path(output_dir, filename) for filename in checked]
+    if len(checked) <= 1:
+        errors = [_check_path(filename, path) for filename, path in zip(checked, paths)]
+    else:
+        # Threads, not processes: the backlog validates from several threads, and forking those is unsafe.
+        # The external checkers run in their own processes anyway.
+        with ThreadPoolExecutor(max_workers=min(len(checked), workers or os.cpu_count() or 1)) as pool:
+            errors = list(pool.map(_check_path, checked, paths))
+    return {filename: error for filename, error in zip(checked, errors) if error}
+
+
+def repair_prompt(issue_body, failures, output_dir=engine.OUTPUT_DIR):
+    parts = [engine.build_prompt(issue_body), REPAIR]
+    for filename, error in failures.items():
+        with open(engine.output_path(output_dir, filename)) as f:
+            content = f.read()
+        parts.append(f"--- {filename}\nError: {error}\n{content}")
+    return "\n\n".join(parts)
+
+
+def validate_files(issue_body, files, api_key, output_dir=engine.OUTPUT_DIR, model=engine.MODEL,
+                   max_tokens=engine.MAX_TOKENS, repairs=MAX_REPAIRS):
+    """Check the written files, ask the model to fix the broken ones and return the files as generated."""
+    from autocoder_bot.recovery import start_parsing
+
+    failures = validate(files, output_dir)
+    for _ in range(repairs):
+        if not failures:
+            break
+        print(f"{len(failures)} file(s) failed validation, asking for a corrected version of "
+              f"{', '.join(failures)}.")
+        answer = engine.send_prompt(repair_prompt(issue_body, failures, output_dir), api_key, model=model,
+                                    max_tokens=max_tokens)
+        repaired = {}
+        start_parsing(engine.message_content(answer) or "", repaired)
+        repaired = {filename: content for filename, content in repaired.items() if filename in failures}
+        engine.write_files(repaired, output_dir)
+        files = {**files, **repaired}
+        failures = {**{filename: error for filename, error in failures.items() if filename not in repaired},
+                    **validate(repaired, output_dir)}
+    if failures:
+        raise engine.GenerationError("The generated code does not pass validation:\n"
+                                     + "\n".join(f"{os.path.join(output_dir, filename)}: {error}"
+                                                 for filename, error in failures.items())
+                                     + "\nPlease rerun the job.")
+    return files
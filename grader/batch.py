@@ -0,0 +1,113 @@
+"""
+Grade a cohort of learner repositories in one process.
+
+    python -m grader.batch urls.txt --stages 1-7 --output results.jsonl
+
+Every repository is checked with the same ``GitTest`` classes as the single-repository run,
+but the stage modules are imported once and configured by ``grader.stages`` so all
+repositories share one HTTP session and connection pool. Results are written as JSON lines, one per repository and stage.
+"""
+import argparse
+import importlib
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
+from hstest import WrongAnswer
+
+from grader import stages
+from grader.ratelimit import get_token_pool
+
+STAGES = range(1, 8)
+
+
+@lru_cache(maxsize=None)
+def load_stage(stage):
+    test_class = importlib.import_module(f"AutoCoder.stage{stage}.test.tests").GitTest
+    stages.configure(importlib.import_module(f"AutoCoder.stage{stage}.test.repository"))
+    return test_class
+
+
+def stage_checks(test_class):
+    """The @dynamic_test methods of a stage, in the order they are declared and run."""
+    return [name for name, member in vars(test_class).items() if name.startswith("check_") and callable(member)]
+
+
+def grade(repo_url, stage):
+    test = load_stage(stage)()
+    test.repo_url = repo_url
+    result = {"url": repo_url, "stage": stage, "status": "passed", "check": None, "feedback": ""}
+    started = time.monotonic()
+    for check in stage_checks(type(test)):
+        result["check"] = check
+        try:
+            outcome = getattr(test, check)()
+        except WrongAnswer as e:
+            result.update(status="failed", feedback=str(e))
+            break
+        except Exception as e:
+            result.update(status="error", feedback=f"{type(e).__name__}: {e}")
+            break
+        if not outcome.is_correct:
+            result.update(status="failed", feedback=outcome.feedback)
+            break
+    else:
+        result["check"] = None
+    result["seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def grade_repository(repo_url, stages):
+    # Stages of one repository run in order so that they share its snapshot and prefetched data
+    return [grade(repo_url, stage) for stage in stages]
+
+
+def parse_stages(value):
+    stages = []
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        stages.extend(range(int(first), int(last or first) + 1))
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown stage(s): {', '.join(map(str, unknown))}")
+    return stages
+
+
+def read_urls(source):
+    with (sys.stdin if source == "-" else open(source)) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade many AutoCoder repositories in one process.")
+    parser.add_argument("urls", help="file with one repository URL per line, or - for stdin")
+    parser.add_argument("--stages", type=parse_stages, default=list(STAGES), help="e.g. 7, 5-7 or 1,3,5 (default: all)")
+    parser.add_argument("--workers", type=int, default=get_token_pool().concurrency,
+                        help="repositories graded at the same time (default: 4 per token in GITHUB_TOKENS)")
+    parser.add_argument("--output", default="-", help="JSON lines output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    urls = read_urls(args.urls)
+    for stage in args.stages:
+        load_stage(stage)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers), thread_name_prefix="batch") as executor:
+            futures = [executor.submit(grade_repository, repo_url, args.stages) for repo_url in urls]
+            for future in as_completed(futures):
+                for result in future.result():
+                    failed += result["status"] != "passed"
+                    output.write(json.dumps(result) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Benchmark of the grading cost per stage: wall-clock time, GitHub API requests and bytes.
+
+    python -m grader.bench --sizes 1,10,100 --stages 1-7 --output bench.json
+    python -m grader.bench --baseline bench.json
+
+Every stage is run against synthetic repositories of increasing size served by
+``grader.stub_server``, one per stage holding that stage's reference solution, so every check of
+the stage runs. A size of N means N extra files, N issues, N/4 pull requests and N/2 workflow
+runs; stage 1 allows no file besides its three, so there N lengthens the README instead.
+``--fixtures`` together with
+``--url`` benchmarks recorded repositories instead (see ``grader.fixtures``). Each measurement
+starts cold, without the snapshots and repository handles a previous stage left behind, and the
+HTTP cache is off unless ``--http-cache`` is given, so the numbers are what one grading run costs.
+
+The result is a JSON document with, per repository size and stage, the median time, the number
+of requests and bytes per endpoint. With ``--baseline`` the run is compared with a previous
+result and exits with 1 when a stage makes more requests or downloads more bytes than allowed
+by ``--tolerance``; wall-clock time is only compared when ``--time-tolerance`` is given, since
+it depends on the machine.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import threading
+from collections import defaultdict
+
+import github
+
+from grader import stages, transport
+from grader.batch import STAGES, grade, load_stage, parse_stages
+from grader.fixtures import load_fixtures
+from grader.stub_server import FakeRepository, StubGitHub, serve
+
+COURSE = os.path.join(os.path.dirname(__file__), "..", "AutoCoder")
+DEFAULT_SIZES = "1,10,100"
+LABEL = "autocoder-bot"
+
+# Most specific first: the path is reduced to the endpoint it calls, without ids and names
+ENDPOINTS = [
+    (re.compile(r"^/repos/[^/]+/[^/]+"), "/repos/{owner}/{repo}"),
+    (re.compile(r"/git/trees/.+$"), "/git/trees/{ref}"),
+    (re.compile(r"/contents/.+$"), "/contents/{path}"),
+    (re.compile(r"/[0-9a-f]{40}(?=/|$)"), "/{sha}"),
+    (re.compile(r"/\d+(?=/|$)"), "/{number}"),
+]
+
+
+def endpoint(request):
+    path = request.path_url.split("?")[0]
+    # Behind GitHub Enterprise or the stand-in the API lives under a path prefix
+    path = path[path.find("/repos/"):] if "/repos/" in path else path
+    for pattern, replacement in ENDPOINTS:
+        path = pattern.sub(replacement, path)
+    return f"{request.method} {path}"
+
+
+class RequestCounter:
+    """Transport hook tallying requests and bytes per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = defaultdict(lambda: {"requests": 0, "bytes": 0})
+            self.cache_hits = 0
+
+    def __call__(self, response):
+        status = getattr(response, "cache_status", None)
+        with self._lock:
+            if status == "hit":
+                self.cache_hits += 1
+                return
+            counts = self.endpoints[endpoint(response.request)]
+            counts["requests"] += 1
+            # A 304 answered from the cache only transferred its headers
+            counts["bytes"] += 0 if status == "revalidated" else len(response.content)
+
+    def totals(self):
+        with self._lock:
+            return {
+                "requests": sum(counts["requests"] for counts in self.endpoints.values()),
+                "bytes": sum(counts["bytes"] for counts in self.endpoints.values()),
+                "cache_hits": self.cache_hits,
+                "endpoints": dict(sorted(self.endpoints.items())),
+            }
+
+
+# The files of each stage's reference solution, as paths under AutoCoder/
+STAGE_FILES = {
+    1: {".github/workflows/main.yml": "stage2/test/reference-workflow.yml", "scripts/script.sh": "stage5/script.sh"},
+    2: {".github/workflows/main.yml": "stage2/test/reference-workflow.yml"},
+    3: {".github/workflows/main.yml": "stage3/test/reference-workflow.yml"},
+    4: {".github/workflows/main.yml": "stage3/test/reference-workflow.yml"},
+    5: {".github/workflows/main.yml": "stage5/test/reference-solution.yml", "scripts/script.sh": "stage5/script.sh"},
+    6: {".github/workflows/main.yml": "stage6/test/reference-workflow.yml", "scripts/script.sh": "stage6/script.sh"},
+    7: {".github/workflows/main.yml": "stage7/test/reference-workflow.yml",
+        "action.yml": "stage7/test/reference-metadata.yml", "scripts/script.sh": "stage7/script.sh"},
+}
+DESCRIPTION = "This repository generates code from the description of its issues with a GitHub Actions workflow.\n"
+
+
+def read_reference(path):
+    with open(os.path.join(COURSE, *path.split("/"))) as f:
+        return f.read()
+
+
+def synthetic_repository(size, stage=7, owner="bench", name=None):
+    """A repository that passes ``stage``, padded with ``size`` files, issues, PRs and runs."""
+    name = name or f"autocoder-{size}-stage{stage}"
+    files = {path: read_reference(reference).replace("the-nulldev/AutoCoder-tests@", f"{owner}/{name}@")
+             for path, reference in STAGE_FILES[stage].items()}
+    if stage == 1:
+        # Stage 1 rejects any other file, so the README grows instead
+        files["README.md"] = f"# {name}\n\n" + DESCRIPTION * (size + 4)
+    else:
+        files["README.md"] = f"# {name}\n"
+        files.update({f"autocoder-bot/src/module_{i}.py": f"def function_{i}():\n    return {i}\n"
+                      for i in range(size)})
+    issues = [{"number": i, "title": f"Issue {i}", "body": "Create a function that returns a number.\n" * 8,
+               "labels": [LABEL]} for i in range(1, size + 1)]
+    pulls = [{"number": size + i, "title": f"Add code snippets from issue #{i}", "user": "github-actions[bot]",
+              "body": f"This pull request adds code snippets from issue #{i}.", "labels": [LABEL],
+              "head": f"autocoder-branch-{i}", "commits": [{"name": LABEL, "email": "actions@github.com"}]}
+             for i in range(1, max(1, size // 4) + 1)]
+    # Stage 2's workflow runs on push, the later ones on issues
+    runs = [{"event": "push" if stage == 2 else "issues", "conclusion": "success",
+             "artifacts": ["autocoder-artifact"]} for _ in range(max(1, size // 2))]
+    return FakeRepository({"owner": owner, "name": name, "files": files, "issues": issues,
+                           "pulls": pulls, "workflow_runs": runs})
+
+
+def cold_start():
+    """Forget what earlier measurements loaded, so each stage pays for its own requests."""
+    for repository in stages.configured():
+        repository.reset()
+
+
+def measure(counter, repo_url, stage, repeat):
+    runs = []
+    for _ in range(repeat):
+        cold_start()
+        counter.reset()
+        result = grade(repo_url, stage)
+        # Prefetches started for the checks after a failure still cost requests
+        for repository in stages.configured():
+            repository.drain()
+        runs.append((result, counter.totals()))
+    result, totals = runs[-1]
+    return {
+        "stage": stage,
+        "status": result["status"],
+        "check": result["check"],
+        "seconds": round(statistics.median(r["seconds"] for r, _ in runs), 3),
+        **totals,
+    }
+
+
+def compare(results, baseline, tolerance, time_tolerance):
+    """Describe every measurement that got more expensive than in the baseline."""
+    previous = {(r["repository"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["repository"], result["stage"]))
+        if before is None:
+            continue
+        limits = {"requests": tolerance, "bytes": tolerance}
+        if time_tolerance is not None:
+            limits["seconds"] = time_tolerance
+        for metric, allowed in limits.items():
+            if result[metric] > before[metric] * (1 + allowed):
+                regressions.append(f"{result['repository']} stage {result['stage']}: "
+                                   f"{metric} {before[metric]} -> {result[metric]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the time and GitHub API cost of grading each stage.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"sizes of the synthetic repositories, comma-separated (default: {DEFAULT_SIZES})")
+    parser.add_argument("--stages", type=parse_stages, default=list(STAGES), help="e.g. 7, 5-7 or 1,3,5 (default: all)")
+    parser.add_argument("--fixtures", help="directory of responses recorded with GRADER_RECORD")
+    parser.add_argument("--url", action="append", default=[], help="recorded repository to benchmark, repeatable")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the median time is kept")
+    parser.add_argument("--http-cache", action="store_true", help="keep the persistent HTTP cache on")
+    parser.add_argument("--output", default="-", help="JSON output file (default: stdout)")
+    parser.add_argument("--baseline", help="previous output to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="allowed relative increase of requests and bytes (default: 0)")
+    parser.add_argument("--time-tolerance", type=float, help="allowed relative increase of the time")
+    args = parser.parse_args(argv)
+
+    if not args.http_cache:
+        os.environ["GRADER_HTTP_CACHE"] = "off"
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()] if not args.url else []
+    repositories = {(size, stage): synthetic_repository(size, stage) for size in sizes for stage in args.stages}
+    stub = StubGitHub(repositories.values(), load_fixtures(args.fixtures) if args.fixtures else None)
+    server, base_url = serve(stub)
+    os.environ["GITHUB_API_URL"] = base_url
+
+    for stage in args.stages:
+        load_stage(stage)
+    counter = RequestCounter()
+    transport.add_response_hook(counter)
+
+    targets = [(f"size-{size}", stage, f"https://github.com/{repo.full_name}")
+               for (size, stage), repo in repositories.items()]
+    targets += [(url, stage, url) for url in args.url for stage in args.stages]
+    results = []
+    try:
+        for label, stage, repo_url in targets:
+            result = {"repository": label, **measure(counter, repo_url, stage, max(1, args.repeat))}
+            if label.startswith("size-"):
+                result["size"] = int(label[len("size-"):])
+            results.append(result)
+            print(f"{label} stage {stage}: {result['seconds']}s, {result['requests']} requests, "
+                  f"{result['bytes']} bytes ({result['status']})", file=sys.stderr)
+    finally:
+        transport.remove_response_hook(counter)
+        server.shutdown()
+
+    report = {
+        "python": platform.python_version(),
+        "pygithub": github.__version__ if hasattr(github, "__version__") else None,
+        "repeat": args.repeat,
+        "http_cache": args.http_cache,
+        "results": results,
+    }
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        json.dump(report, output, indent=2)
+        output.write("\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.time_tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
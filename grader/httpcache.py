@@ -0,0 +1,154 @@
+"""
+Persistent conditional-request cache for the GitHub API reads of the stage tests.
+
+Learners re-submit the same repository many times, so most responses have not changed since the
+previous grading run. Successful GET responses are stored on disk with their ``ETag`` and
+``Last-Modified`` headers; the next identical request is sent with ``If-None-Match`` /
+``If-Modified-Since`` and a ``304 Not Modified`` (which does not count against the rate limit)
+is answered from the stored body. Git blobs are addressed by their sha and never change, so
+they are served from the cache without asking GitHub at all.
+
+The cache is a SQLite file, ``~/.cache/autocoder-grader/http.sqlite`` by default, evicted in
+least-recently-used order once it grows past its size cap. Configure it with
+``GRADER_HTTP_CACHE`` (a path, or ``off``) and ``GRADER_HTTP_CACHE_MB``.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from grader.ratelimit import SchedulingAdapter
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "autocoder-grader", "http.sqlite")
+DEFAULT_SIZE_MB = 256
+
+IMMUTABLE_URL = re.compile(r"/repos/[^/]+/[^/]+/git/blobs/[0-9a-f]{40}$")
+# Headers that describe the original transfer, not the cached (already decoded) body
+TRANSFER_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+class CachedResponse:
+    def __init__(self, url, etag, last_modified, headers, body):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.headers = headers
+        self.body = body
+
+    def to_response(self, request, revalidation=None):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(self.headers)
+        if revalidation is not None:
+            # Keep the fresh rate-limit and date headers of the 304
+            response.headers.update({k: v for k, v in revalidation.headers.items()
+                                     if k.lower() not in TRANSFER_HEADERS})
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = self.body
+        response.url = request.url
+        response.request = request
+        # Lets the transport hooks tell cache hits and 304s from full network responses
+        response.cache_status = "hit" if revalidation is None else "revalidated"
+        return response
+
+
+class HTTPCache:
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_SIZE_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    @staticmethod
+    def key(request):
+        return f"{request.method} {request.url} {request.headers.get('Accept', '')}"
+
+    def get(self, key):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT etag, last_modified, headers, body FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        etag, last_modified, headers, body = row
+        return CachedResponse(key, etag, last_modified, json.loads(headers), body)
+
+    def put(self, key, response):
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in TRANSFER_HEADERS}
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (key, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                              json.dumps(headers), body, len(body), time.time()))
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+
+class CachingAdapter(SchedulingAdapter):
+    """The rate-limit scheduler, answering GET requests from the cache where it can."""
+
+    def __init__(self, pool, cache, **kwargs):
+        self.cache = cache
+        super().__init__(pool, **kwargs)
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+        key = self.cache.key(request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            if IMMUTABLE_URL.search(request.path_url.split("?")[0]):
+                return cached.to_response(request)
+            if cached.etag:
+                request.headers["If-None-Match"] = cached.etag
+            elif cached.last_modified:
+                request.headers["If-Modified-Since"] = cached.last_modified
+
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            return cached.to_response(request, revalidation=response)
+        if response.status_code == 200 and (response.headers.get("ETag") or response.headers.get("Last-Modified")
+                                            or IMMUTABLE_URL.search(request.path_url.split("?")[0])):
+            self.cache.put(key, response)
+        return response
+
+
+def get_cache():
+    """The cache configured by the environment, or None when it is turned off."""
+    path = os.getenv("GRADER_HTTP_CACHE", DEFAULT_PATH)
+    if path.lower() in ("", "0", "off", "false", "no"):
+        return None
+    return HTTPCache(path, int(os.getenv("GRADER_HTTP_CACHE_MB", DEFAULT_SIZE_MB)) * 1024 * 1024)
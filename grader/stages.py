@@ -0,0 +1,104 @@
+"""
+The stage helpers module, kept identical across the stages and configured for batch grading.
+
+Every stage ships its own ``test/repository.py``, since a learner downloads the stages one by
+one and the tests must run with PyGithub alone. The copies are one module: stage 1's is the
+source, the others are written from it and must not be edited by hand.
+
+    python -m grader.stages --check   # exit with 1 when a copy differs from stage 1's
+    python -m grader.stages --sync    # write stage 1's module over the other copies
+
+The batch grader and the benchmark run the stages' own code and only configure it through the
+functions the module exposes: the rate-limited, cached session of ``grader.transport``, no
+PyGithub pause between requests since that session paces them, snapshots of local git sources
+when ``GRADER_SOURCE`` is set (see ``grader.local``), and one set of repositories, snapshots and
+blobs shared by all the stages, so the stages of a repository reuse what the previous ones loaded.
+"""
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+import threading
+from functools import partial
+
+COURSE = os.path.join(os.path.dirname(__file__), "..", "AutoCoder")
+STAGES = range(1, 8)
+SOURCE_STAGE = 1
+
+# The module state the stages share once configured; the first module configured provides it
+SHARED_STATE = ("_lock", "_repos", "_blobs", "_blobs_lock", "_blob_locks", "_snapshots", "_snapshots_lock")
+
+_configured = []
+_configure_lock = threading.Lock()
+
+
+def module_path(stage):
+    return os.path.normpath(os.path.join(COURSE, f"stage{stage}", "test", "repository.py"))
+
+
+def copies():
+    """The paths of the copies written from stage 1's module."""
+    return [module_path(stage) for stage in STAGES if stage != SOURCE_STAGE]
+
+
+def check():
+    """The copies that differ from stage 1's module."""
+    source = module_path(SOURCE_STAGE)
+    return [path for path in copies() if not os.path.exists(path) or not filecmp.cmp(source, path, shallow=False)]
+
+
+def sync():
+    """Write stage 1's module over the copies that differ; return their paths."""
+    outdated = check()
+    for path in outdated:
+        shutil.copyfile(module_path(SOURCE_STAGE), path)
+    return outdated
+
+
+def configure(repository):
+    """Set up the stage helpers module ``repository`` for grading many repositories in one process."""
+    # Imported here: the transport pulls in the rate-limit scheduler and the HTTP cache
+    from grader import local, transport
+
+    with _configure_lock:
+        if repository in _configured:
+            return
+        if _configured:
+            for name in SHARED_STATE:
+                setattr(repository, name, getattr(_configured[0], name))
+        _configured.append(repository)
+    repository.SECONDS_BETWEEN_REQUESTS = None
+    repository.set_session(transport.get_session(repository.POOL_SIZE))
+    source = os.getenv("GRADER_SOURCE", "api")
+    if source != "api":
+        repository.set_snapshot_opener(partial(local.open_snapshot, repository, source))
+
+
+def configured():
+    """The stage helpers modules configured so far."""
+    with _configure_lock:
+        return list(_configured)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m grader.stages",
+                                     description="Check or sync the copies of the stage helpers module.")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--check", action="store_true", help="exit with 1 when a copy differs from stage 1's")
+    action.add_argument("--sync", action="store_true", help="write stage 1's module over the other copies")
+    args = parser.parse_args(argv)
+
+    source = os.path.relpath(module_path(SOURCE_STAGE))
+    if args.sync:
+        for path in sync():
+            print(f"Updated {os.path.relpath(path)} from {source}")
+        return 0
+    outdated = check()
+    for path in outdated:
+        print(f"{os.path.relpath(path)} differs from {source}; run python -m grader.stages --sync")
+    return 1 if outdated else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
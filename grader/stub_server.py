@@ -0,0 +1,316 @@
+"""
+Local stand-in for the GitHub REST endpoints used by the stage tests.
+
+    python -m grader.stub_server --fixtures recorded/ repos/*.yml
+    GITHUB_API_URL=http://127.0.0.1:8765 python -m grader.batch urls.txt
+
+Requests are answered from fixtures recorded with ``GRADER_RECORD`` (see ``grader.fixtures``)
+when one matches exactly, and otherwise from repository descriptions such as::
+
+    owner: learner
+    name: autocoder
+    files:
+      README.md: "# autocoder ..."
+      .github/workflows/main.yml: "..."
+    issues:
+      - {number: 1, title: Scaffold, body: "...", labels: [autocoder-bot]}
+    pulls:
+      - number: 2
+        title: "Add code snippets from issue #1"
+        user: github-actions[bot]
+        labels: [autocoder-bot]
+        head: autocoder-branch-1
+        commits: [{name: autocoder-bot, email: actions@github.com}]
+    workflow_runs:
+      - {event: issues, conclusion: success, artifacts: [autocoder-artifact]}
+
+which cover repositories, contents, git trees and blobs, issues, pulls and their commits,
+workflow runs and artifacts. Lists are paginated with ``Link`` headers, responses carry ETags
+and honour ``If-None-Match``, and every token gets its own ``X-RateLimit-*`` budget, so the
+grader sees the same shapes and headers as on github.com.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+
+import yaml
+
+from grader.fixtures import BASE_URL_PLACEHOLDER, fixture_key, load_fixtures
+
+RATE_LIMIT = 5000
+DEFAULT_PER_PAGE = 30
+
+
+def blob_sha(content):
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class FakeRepository:
+    def __init__(self, description):
+        self.owner = description["owner"]
+        self.name = description["name"]
+        self.full_name = f"{self.owner}/{self.name}"
+        self.default_branch = description.get("default_branch", "main")
+        self.private = description.get("private", False)
+        self.files = {path: content.encode() if isinstance(content, str) else content
+                      for path, content in description.get("files", {}).items()}
+        self.issues = description.get("issues", [])
+        self.pulls = description.get("pulls", [])
+        self.workflow_runs = description.get("workflow_runs", [])
+        self.blobs = {blob_sha(content): content for content in self.files.values()}
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(yaml.safe_load(f))
+
+    def directories(self):
+        directories = set()
+        for path in self.files:
+            parts = path.split("/")[:-1]
+            directories.update("/".join(parts[:i]) for i in range(1, len(parts) + 1))
+        return directories
+
+
+class StubGitHub:
+    def __init__(self, repositories=(), fixtures=None):
+        self.repositories = {repo.full_name.lower(): repo for repo in repositories}
+        self.fixtures = fixtures or {}
+        self.base_url = ""
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    # --- response helpers -------------------------------------------------------------------
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+    def rate_limit_headers(self, token, charge):
+        with self._lock:
+            remaining, reset = self._budgets.get(token, (RATE_LIMIT, int(time.time()) + 3600))
+            if reset < time.time():
+                remaining, reset = RATE_LIMIT, int(time.time()) + 3600
+            if charge:
+                remaining = max(remaining - 1, 0)
+            self._budgets[token] = (remaining, reset)
+        return {"X-RateLimit-Limit": str(RATE_LIMIT), "X-RateLimit-Remaining": str(remaining),
+                "X-RateLimit-Reset": str(reset), "X-RateLimit-Resource": "core"}
+
+    def paginate(self, path, query, items, wrap=None):
+        per_page = int(query.get("per_page", DEFAULT_PER_PAGE))
+        page = max(int(query.get("page", 1)), 1)
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        chunk = items[(page - 1) * per_page:page * per_page]
+        headers = {}
+        links = []
+        if page < last:
+            links.append(f'<{self.url(path)}?{urlencode({**query, "per_page": per_page, "page": page + 1})}>; rel="next"')
+            links.append(f'<{self.url(path)}?{urlencode({**query, "per_page": per_page, "page": last})}>; rel="last"')
+        if links:
+            headers["Link"] = ", ".join(links)
+        body = {"total_count": len(items), wrap: chunk} if wrap else chunk
+        return 200, body, headers
+
+    # --- GitHub objects ---------------------------------------------------------------------
+
+    def repo_json(self, repo):
+        # Stable across processes, unlike hash(), so responses are byte-for-byte reproducible
+        repo_id = int(hashlib.sha1(repo.full_name.encode()).hexdigest()[:7], 16)
+        return {"id": repo_id, "name": repo.name, "full_name": repo.full_name,
+                "owner": {"login": repo.owner}, "private": repo.private,
+                "default_branch": repo.default_branch, "url": self.url(f"/repos/{repo.full_name}")}
+
+    def file_json(self, repo, path, with_content):
+        content = repo.files[path]
+        data = {"type": "file", "name": path.rsplit("/", 1)[-1], "path": path, "sha": blob_sha(content),
+                "size": len(content), "url": self.url(f"/repos/{repo.full_name}/contents/{path}")}
+        if with_content:
+            data.update(encoding="base64", content=base64.b64encode(content).decode())
+        return data
+
+    def issue_json(self, repo, issue, pull=False):
+        data = {"number": issue["number"], "title": issue.get("title", ""), "body": issue.get("body"),
+                "state": issue.get("state", "open"), "user": {"login": issue.get("user", repo.owner)},
+                "labels": [{"name": label} for label in issue.get("labels", [])],
+                "assignees": [{"login": login} for login in issue.get("assignees", [])],
+                "url": self.url(f"/repos/{repo.full_name}/issues/{issue['number']}")}
+        if pull:
+            data["pull_request"] = {"url": self.url(f"/repos/{repo.full_name}/pulls/{issue['number']}")}
+        return data
+
+    def pull_json(self, repo, pull, detailed):
+        data = self.issue_json(repo, pull)
+        data.update(url=self.url(f"/repos/{repo.full_name}/pulls/{pull['number']}"),
+                    head={"ref": pull.get("head", f"branch-{pull['number']}")},
+                    base={"ref": pull.get("base", repo.default_branch)})
+        if detailed:
+            data["mergeable_state"] = pull.get("mergeable_state", "clean")
+        return data
+
+    def run_json(self, repo, index, run):
+        run_id = run.get("id", 1000 + index)
+        run_url = self.url(f"/repos/{repo.full_name}/actions/runs/{run_id}")
+        return {"id": run_id, "event": run.get("event", "push"), "status": run.get("status", "completed"),
+                "conclusion": run.get("conclusion", "success"), "url": run_url,
+                "artifacts_url": f"{run_url}/artifacts"}
+
+    # --- routing ----------------------------------------------------------------------------
+
+    def handle(self, method, raw_path, headers):
+        fixture = self.fixtures.get(fixture_key(method, raw_path))
+        if fixture is not None:
+            body = fixture["body"].replace(BASE_URL_PLACEHOLDER, self.base_url)
+            return fixture["status"], body, {name: value.replace(BASE_URL_PLACEHOLDER, self.base_url)
+                                             for name, value in fixture["headers"].items()}
+        if method != "GET":
+            return 405, {"message": "The stand-in server is read-only"}, {}
+        parts = urlsplit(raw_path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        path = unquote(parts.path).rstrip("/")
+        if path == "/rate_limit":
+            return 200, {"resources": {"core": {"limit": RATE_LIMIT}}}, {}
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)(/.*)?", path)
+        repo = self.repositories.get(f"{match.group(1)}/{match.group(2)}".lower()) if match else None
+        if repo is None:
+            return 404, {"message": "Not Found"}, {}
+        return self.route(repo, match.group(3) or "", path, query)
+
+    def route(self, repo, rest, path, query):
+        if rest == "":
+            return 200, self.repo_json(repo), {}
+        match = re.fullmatch(r"/git/trees/([^/]+)", rest)
+        if match:
+            tree = [{"path": d, "type": "tree", "mode": "040000", "sha": blob_sha(d.encode())}
+                    for d in sorted(repo.directories())]
+            tree += [{"path": p, "type": "blob", "mode": "100644", "sha": blob_sha(c), "size": len(c)}
+                     for p, c in sorted(repo.files.items())]
+            if query.get("recursive") is None:
+                tree = [entry for entry in tree if "/" not in entry["path"]]
+            return 200, {"sha": blob_sha(repo.default_branch.encode()), "tree": tree, "truncated": False}, {}
+        match = re.fullmatch(r"/git/blobs/([0-9a-f]{40})", rest)
+        if match and match.group(1) in repo.blobs:
+            content = repo.blobs[match.group(1)]
+            return 200, {"sha": match.group(1), "size": len(content), "encoding": "base64",
+                         "content": base64.b64encode(content).decode()}, {}
+        match = re.fullmatch(r"/contents(?:/(.*))?", rest)
+        if match:
+            target = match.group(1) or ""
+            if target in repo.files:
+                return 200, self.file_json(repo, target, with_content=True), {}
+            if target == "" or target in repo.directories():
+                prefix = f"{target}/" if target else ""
+                children = sorted({p[len(prefix):].split("/")[0] for p in repo.files if p.startswith(prefix)})
+                return 200, [self.file_json(repo, prefix + c, False) if prefix + c in repo.files else
+                             {"type": "dir", "name": c, "path": prefix + c} for c in children], {}
+        if rest == "/issues":
+            labels = set(filter(None, query.get("labels", "").split(",")))
+            items = [self.issue_json(repo, i) for i in repo.issues]
+            items += [self.issue_json(repo, p, pull=True) for p in repo.pulls]
+            items = [i for i in items if query.get("state", "open") in ("all", i["state"])
+                     and labels <= {label["name"] for label in i["labels"]}]
+            return self.paginate(path, query, sorted(items, key=lambda i: -i["number"]))
+        match = re.fullmatch(r"/issues/(\d+)", rest)
+        if match:
+            number = int(match.group(1))
+            issue = next((i for i in repo.issues if i["number"] == number), None)
+            if issue is not None:
+                return 200, self.issue_json(repo, issue), {}
+            pull = next((p for p in repo.pulls if p["number"] == number), None)
+            if pull is not None:
+                return 200, self.issue_json(repo, pull, pull=True), {}
+        if rest == "/pulls":
+            items = [self.pull_json(repo, p, detailed=False) for p in repo.pulls
+                     if query.get("state", "open") in ("all", p.get("state", "open"))]
+            return self.paginate(path, query, sorted(items, key=lambda p: -p["number"]))
+        match = re.fullmatch(r"/pulls/(\d+)(/commits)?", rest)
+        pull = next((p for p in repo.pulls if match and p["number"] == int(match.group(1))), None)
+        if pull is not None and match.group(2):
+            commits = [{"sha": blob_sha(json.dumps(c).encode()), "commit": {"author": c}}
+                       for c in pull.get("commits", [])]
+            return self.paginate(path, query, commits)
+        if pull is not None:
+            return 200, self.pull_json(repo, pull, detailed=True), {}
+        if rest == "/actions/runs":
+            runs = [self.run_json(repo, i, run) for i, run in enumerate(repo.workflow_runs)]
+            return self.paginate(path, query, runs[::-1], wrap="workflow_runs")
+        match = re.fullmatch(r"/actions/runs/(\d+)/artifacts", rest)
+        if match:
+            runs = {self.run_json(repo, i, run)["id"]: run for i, run in enumerate(repo.workflow_runs)}
+            if int(match.group(1)) in runs:
+                artifacts = [{"id": n, "name": name} for n, name in enumerate(runs[int(match.group(1))].get("artifacts", []))]
+                return self.paginate(path, query, artifacts, wrap="artifacts")
+        return 404, {"message": "Not Found"}, {}
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stub = None
+
+    def do_GET(self):
+        # The stand-in ignores request bodies, but they must be read off a keep-alive connection
+        # or they would be parsed as the next request
+        length = self.headers.get("Content-Length")
+        if length:
+            self.rfile.read(int(length))
+        elif self.headers.get("Transfer-Encoding"):
+            self.close_connection = True
+        status, body, headers = self.stub.handle(self.command, self.path, self.headers)
+        payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        # A replayed fixture keeps the ETag github.com sent, so that is the one to compare against
+        etag = next((value for name, value in headers.items() if name.lower() == "etag"), None)
+        if etag is None:
+            etag = headers["ETag"] = 'W/"%s"' % hashlib.sha1(payload).hexdigest()
+        not_modified = status == 200 and self.headers.get("If-None-Match") == etag
+        headers = {"Content-Type": "application/json; charset=utf-8", **headers,
+                   **self.stub.rate_limit_headers(self.headers.get("Authorization"), charge=not not_modified)}
+        if not_modified:
+            status, payload = 304, b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_POST = do_PATCH = do_PUT = do_DELETE = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(stub, host="127.0.0.1", port=0):
+    """Start the stand-in server on a background thread and return it with its base URL."""
+    handler = type("Handler", (StubRequestHandler,), {"stub": stub})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    stub.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True, name="stub-github").start()
+    return server, stub.base_url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the GitHub API.")
+    parser.add_argument("repositories", nargs="*", help="YAML repository descriptions")
+    parser.add_argument("--fixtures", help="directory of responses recorded with GRADER_RECORD")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    stub = StubGitHub([FakeRepository.load(path) for path in args.repositories],
+                      load_fixtures(args.fixtures) if args.fixtures else None)
+    server, base_url = serve(stub, args.host, args.port)
+    print(f"Serving the GitHub API stand-in at {base_url}, use GITHUB_API_URL={base_url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
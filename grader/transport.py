@@ -0,0 +1,69 @@
+"""
+HTTP session the batch grader sends every GitHub request through.
+
+The stage helpers (``AutoCoder/stage*/test/repository.py``) already plug thread-safe connection
+classes under PyGithub, which send everything through one process-wide ``requests.Session`` so
+the checks of a stage can fetch their data concurrently over a single keep-alive connection
+pool. ``grader.stages`` hands them this session instead of their plain one. Its adapter is the
+rate-limit scheduler from ``grader.ratelimit``, which replaces the retry policy PyGithub would
+pass to its own connections, with the conditional-request cache of ``grader.httpcache`` in
+front of it unless that is turned off. Every response is recorded when ``GRADER_RECORD`` is set
+and passed to the hooks added with ``add_response_hook``.
+"""
+import os
+import threading
+
+import requests
+from github.Requester import Requester
+
+from grader.fixtures import record_response
+from grader.httpcache import CachingAdapter, get_cache
+from grader.ratelimit import SchedulingAdapter, get_token_pool
+
+# Directory to record every response into, see grader.fixtures
+RECORD_DIR = os.getenv("GRADER_RECORD")
+
+_response_hooks = []
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=None):
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Same as PyGithub: a non-None auth disables the fallback to .netrc
+                session.auth = Requester.noopAuth
+                pool_options = dict(
+                    pool_connections=pool_size or requests.adapters.DEFAULT_POOLSIZE,
+                    pool_maxsize=pool_size or requests.adapters.DEFAULT_POOLSIZE,
+                )
+                cache = get_cache()
+                if cache is not None:
+                    adapter = CachingAdapter(get_token_pool(), cache, **pool_options)
+                else:
+                    adapter = SchedulingAdapter(get_token_pool(), **pool_options)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.hooks["response"].append(_on_response)
+                _session = session
+    return _session
+
+
+def _on_response(response, *args, **kwargs):
+    if RECORD_DIR:
+        record_response(RECORD_DIR, response)
+    for hook in _response_hooks:
+        hook(response)
+
+
+def add_response_hook(hook):
+    """Call ``hook(response)`` with every ``requests.Response`` handed back to PyGithub."""
+    _response_hooks.append(hook)
+
+
+def remove_response_hook(hook):
+    _response_hooks.remove(hook)
@@ -0,0 +1,92 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from autocoder_bot.artifacts import PackError, pack, unpack
+
+COMMITTED = {"app.py": "a = 1\n", "lib/util.py": "b = 2\n", "old.py": "c = 3\n"}
+
+
+def git(root, *args):
+    return subprocess.run(["git", "-C", root, *args], check=True, capture_output=True, text=True).stdout
+
+
+def write(root, files):
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+        with open(os.path.join(root, path), "w") as f:
+            f.write(content)
+
+
+def read_tree(root):
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            with open(os.path.join(directory, name)) as f:
+                files[os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/")] = f.read()
+    return files
+
+
+class PackTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.checkout = os.path.join(self.tmp, "checkout")
+        self.source = os.path.join(self.checkout, "autocoder-bot")
+        write(self.source, COMMITTED)
+        git(self.tmp, "init", "-q", self.checkout)
+        git(self.checkout, "add", ".")
+        git(self.checkout, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "Generated before")
+        self.base = git(self.checkout, "rev-parse", "HEAD").strip()
+        self.pack_dir = os.path.join(self.tmp, "pack")
+
+    def test_round_trip(self):
+        write(self.source, {"copy.py": COMMITTED["app.py"]})
+        manifest = pack(self.source, self.pack_dir)
+        self.assertEqual(len(manifest["files"]), 4)
+        self.assertEqual(manifest["objects"], 3)
+        destination = os.path.join(self.tmp, "unpacked")
+        unpack(self.pack_dir, destination)
+        self.assertEqual(read_tree(destination), read_tree(self.source))
+
+    def test_changed_only_pack_applies_over_its_base(self):
+        write(self.source, {"app.py": "a = 10\n", "new.py": "d = 4\n"})
+        os.remove(os.path.join(self.source, "old.py"))
+        manifest = pack(self.source, self.pack_dir, changed_only=True)
+        self.assertEqual(sorted(manifest["files"]), ["app.py", "new.py"])
+        self.assertEqual(manifest["deleted"], ["old.py"])
+        self.assertEqual(manifest["base"], self.base)
+
+        # Whoever downloads the artifact only needs a checkout of the base commit
+        clone = os.path.join(self.tmp, "clone")
+        git(self.tmp, "clone", "-q", self.checkout, clone)
+        unpack(self.pack_dir, os.path.join(clone, "autocoder-bot"))
+        self.assertEqual(read_tree(os.path.join(clone, "autocoder-bot")), read_tree(self.source))
+
+    def test_changed_only_pack_of_unchanged_files_is_empty(self):
+        manifest = pack(self.source, self.pack_dir, changed_only=True)
+        self.assertEqual(manifest["files"], {})
+        self.assertEqual(unpack(self.pack_dir, os.path.join(self.tmp, "unpacked")), [])
+
+    def test_changed_only_needs_a_commit(self):
+        source = os.path.join(self.tmp, "not-a-checkout")
+        write(source, {"app.py": "a = 1\n"})
+        with self.assertRaises(PackError):
+            pack(source, self.pack_dir, changed_only=True)
+
+    def test_deleting_outside_the_destination_is_refused(self):
+        os.remove(os.path.join(self.source, "old.py"))
+        pack(self.source, self.pack_dir, changed_only=True)
+        manifest_path = os.path.join(self.pack_dir, "manifest.json")
+        with open(manifest_path) as f:
+            text = f.read()
+        with open(manifest_path, "w") as f:
+            f.write(text.replace('"old.py"', '"../escape.py"'))
+        with self.assertRaises(PackError):
+            unpack(self.pack_dir, os.path.join(self.tmp, "unpacked"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from autocoder_bot import backlog, cli, context, engine
+
+APP = "def greet():\n    return 'hello'\n"
+DIFF = "@@ -2 +2 @@\n-    return 'hello'\n+    return 'hello, world'\n"
+
+
+def answer(content):
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+
+class GenerateIssueTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, "autocoder-bot"))
+        with open(os.path.join(self.root, "autocoder-bot", "app.py"), "w") as f:
+            f.write(APP)
+        for args in (["init", "-q"], ["add", "."],
+                     ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "Generated before"]):
+            subprocess.run(["git", "-C", self.root, *args], check=True, capture_output=True)
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        self.addCleanup(os.chdir, cwd)
+
+        mock.patch.object(context, "DEFAULT_PATH", os.path.join(self.root, ".cache")).start()
+        mock.patch.object(engine, "fetch_issue_body", return_value="Make greet in app.py greet the world").start()
+        self.send_prompt = mock.patch.object(engine, "send_prompt",
+                                             return_value=answer(json.dumps({"app.py": DIFF}))).start()
+        self.addCleanup(mock.patch.stopall)
+        stdout = contextlib.redirect_stdout(io.StringIO())
+        stdout.__enter__()
+        self.addCleanup(stdout.__exit__, None, None, None)
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+
+    def test_files_generated_before_are_editable_in_the_copy(self):
+        engine_args = cli.build_parser().parse_args(["", "learner/autocoder", "1", "key", "--patch", "--no-validation"])
+        generated = backlog.generate_issue(types.SimpleNamespace(number=7), engine_args, self.workdir)
+
+        self.assertEqual(generated, os.path.join(self.workdir, "7"))
+        prompt = self.send_prompt.call_args.args[0]
+        self.assertIn("--- app.py (lines 1-2)", prompt)
+        self.assertNotIn("--- [read-only]", prompt)
+        with open(os.path.join(generated, "app.py")) as f:
+            self.assertEqual(f.read(), APP.replace("'hello'", "'hello, world'"))
+        # The checkout itself is only changed when the branch is committed
+        with open(os.path.join(self.root, "autocoder-bot", "app.py")) as f:
+            self.assertEqual(f.read(), APP)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from grader.httpcache import CachingAdapter, HTTPCache
+from grader.ratelimit import TokenPool
+from grader.stub_server import FakeRepository, StubGitHub, blob_sha, serve
+
+README = "# autocoder\n"
+
+
+class RecordingGitHub(StubGitHub):
+    """The stand-in server, keeping the headers of every request it answers."""
+
+    def __init__(self, repositories=()):
+        super().__init__(repositories)
+        self.requests = []
+
+    def handle(self, method, raw_path, headers):
+        self.requests.append((raw_path, headers.get("If-None-Match")))
+        return super().handle(method, raw_path, headers)
+
+
+def response(body, **headers):
+    result = requests.Response()
+    result.status_code = 200
+    result.headers = requests.structures.CaseInsensitiveDict(headers)
+    result._content = body
+    return result
+
+
+class CachingAdapterTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.cache = HTTPCache(os.path.join(tmp, "http.sqlite"))
+        self.stub = RecordingGitHub([FakeRepository({"owner": "learner", "name": "autocoder",
+                                                     "files": {"README.md": README}})])
+        server, self.base_url = serve(self.stub)
+        self.addCleanup(server.shutdown)
+        self.session = requests.Session()
+        self.session.mount("http://", CachingAdapter(TokenPool(["a"]), self.cache))
+        self.addCleanup(self.session.close)
+
+    def get(self, path):
+        return self.session.get(self.base_url + path)
+
+    def test_not_modified_is_answered_with_the_cached_body(self):
+        first = self.get("/repos/learner/autocoder")
+        second = self.get("/repos/learner/autocoder")
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.cache_status, "revalidated")
+        self.assertEqual(self.stub.requests, [("/repos/learner/autocoder", None),
+                                              ("/repos/learner/autocoder", first.headers["ETag"])])
+        # A 304 does not count against the rate limit, and its fresh headers are kept
+        self.assertEqual(second.headers["X-RateLimit-Remaining"], first.headers["X-RateLimit-Remaining"])
+
+    def test_changed_response_replaces_the_cached_one(self):
+        self.get("/repos/learner/autocoder/issues")
+        self.stub.repositories["learner/autocoder"].issues.append(
+            {"number": 1, "title": "Scaffold", "body": "Add a README", "labels": [], "state": "open"})
+        changed = self.get("/repos/learner/autocoder/issues")
+
+        self.assertEqual(changed.status_code, 200)
+        self.assertFalse(hasattr(changed, "cache_status"))
+        self.assertEqual([issue["number"] for issue in changed.json()], [1])
+        self.assertEqual(self.get("/repos/learner/autocoder/issues").cache_status, "revalidated")
+
+    def test_blobs_are_served_without_asking_github(self):
+        path = f"/repos/learner/autocoder/git/blobs/{blob_sha(README.encode())}"
+        first = self.get(path)
+        second = self.get(path)
+
+        self.assertEqual(second.cache_status, "hit")
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.get("/repos/learner/missing").status_code, 404)
+        self.assertEqual(self.get("/repos/learner/missing").status_code, 404)
+        self.assertEqual(self.stub.requests, [("/repos/learner/missing", None)] * 2)
+
+
+class HTTPCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.path = os.path.join(tmp, "http.sqlite")
+
+    def test_least_recently_used_entries_are_evicted_first(self):
+        cache = HTTPCache(self.path, max_bytes=25)
+        cache.put("a", response(b"a" * 10, ETag='"a"'))
+        cache.put("b", response(b"b" * 10, ETag='"b"'))
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", response(b"c" * 10, ETag='"c"'))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a").body, b"a" * 10)
+        self.assertEqual(cache.get("c").body, b"c" * 10)
+
+    def test_body_larger_than_the_cache_is_not_stored(self):
+        cache = HTTPCache(self.path, max_bytes=5)
+        cache.put("a", response(b"a" * 10, ETag='"a"'))
+        self.assertIsNone(cache.get("a"))
+
+    def test_entries_persist_on_disk(self):
+        HTTPCache(self.path).put("a", response(b"{}", ETag='"a"', **{"Content-Encoding": "gzip"}))
+        cached = HTTPCache(self.path).get("a")
+        self.assertEqual((cached.etag, cached.body), ('"a"', b"{}"))
+        # The body is stored decoded, so the transfer headers no longer apply
+        self.assertNotIn("Content-Encoding", cached.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
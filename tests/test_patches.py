@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from autocoder_bot import engine
+from autocoder_bot.patches import PatchConflict, apply_files, apply_patch, find_hunk, is_diff, parse_hunks
+
+ORIGINAL = "".join(f"line {i}\n" for i in range(1, 21))
+
+
+class FindHunkTest(unittest.TestCase):
+    lines = ORIGINAL.splitlines()
+
+    def test_at_the_named_line(self):
+        self.assertEqual(find_hunk(self.lines, ["line 5", "line 6"], 4, 0), 4)
+
+    def test_nearest_match_to_a_wrong_line_number(self):
+        lines = ["a", "x", "b", "c", "x", "d", "e", "x"]
+        self.assertEqual(find_hunk(lines, ["x"], 5, 0), 4)
+        self.assertEqual(find_hunk(lines, ["x"], 7, 0), 7)
+        self.assertEqual(find_hunk(lines, ["x"], 0, 0), 1)
+
+    def test_not_before_the_previous_hunk(self):
+        lines = ["x", "a", "x", "b"]
+        self.assertEqual(find_hunk(lines, ["x"], 0, 1), 2)
+
+    def test_exact_match_preferred_over_whitespace_match(self):
+        lines = ["x  ", "y", "x"]
+        self.assertEqual(find_hunk(lines, ["x"], 0, 0), 2)
+
+    def test_trailing_whitespace_is_ignored_as_a_fallback(self):
+        self.assertEqual(find_hunk(["a", "b  ", "c"], ["b", "c\t"], 0, 0), 1)
+
+    def test_no_match(self):
+        self.assertIsNone(find_hunk(self.lines, ["line 5", "line 7"], 4, 0))
+
+    def test_pure_insertion(self):
+        self.assertEqual(find_hunk(self.lines, [], 3, 0), 3)
+        self.assertEqual(find_hunk(self.lines, [], 3, 6), 6)
+        self.assertEqual(find_hunk(self.lines, [], 99, 0), len(self.lines))
+
+
+class ApplyPatchTest(unittest.TestCase):
+    def test_change_at_the_named_lines(self):
+        diff = "--- a/f\n+++ b/f\n@@ -4,3 +4,3 @@\n line 4\n-line 5\n+line five\n line 6\n"
+        self.assertEqual(apply_patch(ORIGINAL, diff), ORIGINAL.replace("line 5\n", "line five\n"))
+
+    def test_hunk_with_wrong_line_numbers_is_placed_by_its_context(self):
+        diff = "@@ -1,3 +1,4 @@\n line 14\n line 15\n+inserted\n line 16\n"
+        self.assertEqual(apply_patch(ORIGINAL, diff), ORIGINAL.replace("line 15\n", "line 15\ninserted\n"))
+
+    def test_several_hunks(self):
+        diff = ("@@ -1,2 +1,2 @@\n-line 1\n+first\n line 2\n"
+                "@@ -19,2 +19,3 @@\n line 19\n line 20\n+line 21\n")
+        expected = ORIGINAL.replace("line 1\n", "first\n", 1) + "line 21\n"
+        self.assertEqual(apply_patch(ORIGINAL, diff), expected)
+
+    def test_empty_context_line_without_its_space(self):
+        original = "def f():\n    return 1\n\n\ndef g():\n    return 2\n"
+        diff = "@@ -4,3 +4,3 @@\n\n def g():\n-    return 2\n+    return 3\n"
+        self.assertEqual(apply_patch(original, diff), original.replace("return 2", "return 3"))
+
+    def test_no_newline_marker_is_skipped(self):
+        diff = "@@ -20 +20 @@\n-line 20\n\\ No newline at end of file\n+last\n"
+        self.assertEqual(apply_patch(ORIGINAL, diff), ORIGINAL.replace("line 20\n", "last\n"))
+
+    def test_new_file_from_empty(self):
+        self.assertEqual(apply_patch("", "@@ -0,0 +1,2 @@\n+a\n+b\n"), "a\nb\n")
+
+    def test_conflict_when_removed_lines_are_not_there(self):
+        diff = "@@ -4,3 +4,3 @@\n line 4\n-line 50\n+line five\n line 6\n"
+        with self.assertRaisesRegex(PatchConflict, r"hunk 1 \(@@ -4\)"):
+            apply_patch(ORIGINAL, diff)
+
+    def test_conflict_when_hunks_overlap(self):
+        diff = ("@@ -5,2 +5,2 @@\n-line 5\n+five\n line 6\n"
+                "@@ -5,1 +5,1 @@\n-line 5\n+again\n")
+        with self.assertRaisesRegex(PatchConflict, "hunk 2"):
+            apply_patch(ORIGINAL, diff)
+
+    def test_no_hunks(self):
+        with self.assertRaises(PatchConflict):
+            apply_patch(ORIGINAL, "--- a/f\n+++ b/f\n")
+
+    def test_unexpected_line_in_a_hunk(self):
+        with self.assertRaises(PatchConflict):
+            parse_hunks("@@ -1 +1 @@\n-line 1\n*line one\n")
+
+    def test_is_diff(self):
+        self.assertTrue(is_diff("@@ -1,2 +1,2 @@\n-a\n+b\n"))
+        self.assertFalse(is_diff("print('@@ -1 +1 @@')\n"))
+        self.assertFalse(is_diff({"key": "value"}))
+
+
+class ApplyFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        engine.write_files({"app.py": "a = 1\nb = 2\n"}, self.output_dir)
+
+    def read(self, filename):
+        with open(os.path.join(self.output_dir, filename)) as f:
+            return f.read()
+
+    def test_diffs_and_new_files(self):
+        apply_files({"app.py": "@@ -2 +2 @@\n-b = 2\n+b = 3\n", "new.py": "c = 3\n"}, self.output_dir)
+        self.assertEqual(self.read("app.py"), "a = 1\nb = 3\n")
+        self.assertEqual(self.read("new.py"), "c = 3\n")
+
+    def test_nothing_written_when_a_file_conflicts(self):
+        files = {"app.py": "@@ -2 +2 @@\n-b = 20\n+b = 3\n", "new.py": "c = 3\n"}
+        with self.assertRaisesRegex(engine.GenerationError, "app.py: hunk 1"):
+            apply_files(files, self.output_dir)
+        self.assertEqual(self.read("app.py"), "a = 1\nb = 2\n")
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "new.py")))
+
+
+if __name__ == "__main__":
+    unittest.main()
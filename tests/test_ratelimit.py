@@ -0,0 +1,151 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from grader import ratelimit
+from grader.ratelimit import SECONDARY_BACKOFF, SchedulingAdapter, TokenPool
+from grader.stub_server import StubGitHub, serve
+
+
+class LimitedGitHub(StubGitHub):
+    """The stand-in server, answering 403 like GitHub once a token's budget is used up."""
+
+    def __init__(self, secondary=0, retry_after=None, latency=0):
+        super().__init__()
+        self.secondary = secondary
+        self.retry_after = retry_after
+        self.latency = latency
+        self.tokens = []
+        self.active = {}
+        self.max_active = {}
+
+    def exhaust(self, token, seconds):
+        self._budgets[f"token {token}"] = (0, int(time.time()) + seconds)
+
+    def handle(self, method, raw_path, headers):
+        token = headers.get("Authorization")
+        with self._lock:
+            self.tokens.append(token)
+            self.active[token] = self.active.get(token, 0) + 1
+            self.max_active[token] = max(self.max_active.get(token, 0), self.active[token])
+            remaining, reset = self._budgets.get(token, (1, 0))
+            secondary, self.secondary = self.secondary > 0, max(self.secondary - 1, 0)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if remaining == 0 and reset > time.time():
+                return 403, {"message": "API rate limit exceeded"}, {}
+            if secondary:
+                retry_after = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else {}
+                return 403, {"message": "You have exceeded a secondary rate limit."}, retry_after
+            if raw_path == "/private":
+                return 403, {"message": "Resource not accessible by integration"}, {}
+            return super().handle(method, raw_path, headers)
+        finally:
+            with self._lock:
+                self.active[token] -= 1
+
+
+class SchedulingAdapterTest(unittest.TestCase):
+    def start(self, stub, tokens, per_token=ratelimit.PER_TOKEN_CONCURRENCY):
+        server, self.base_url = serve(stub)
+        self.addCleanup(server.shutdown)
+        self.pool = TokenPool(tokens, per_token=per_token)
+        self.session = requests.Session()
+        self.session.mount("http://", SchedulingAdapter(self.pool))
+        self.addCleanup(self.session.close)
+
+    def get(self, path="/rate_limit"):
+        return self.session.get(self.base_url + path)
+
+    def test_quota_is_read_from_the_headers(self):
+        self.start(StubGitHub(), ["a"])
+        self.assertEqual(self.get().status_code, 200)
+        self.assertEqual(self.pool.tokens[0].remaining, 4999)
+
+    def test_exhausted_token_hands_over_to_another(self):
+        stub = LimitedGitHub()
+        stub.exhaust("a", 600)
+        self.start(stub, ["a", "b"])
+        # The first request learns that "a" is exhausted, the later ones skip it
+        for _ in range(3):
+            self.assertEqual(self.get().status_code, 200)
+        self.assertEqual(stub.tokens, ["token a", "token b", "token b", "token b"])
+        self.assertTrue(self.pool.tokens[0].exhausted(time.time()))
+
+    def test_single_token_waits_for_the_reset(self):
+        stub = LimitedGitHub()
+        stub.exhaust("a", 1)
+        self.start(stub, ["a"])
+        started = time.monotonic()
+        self.assertEqual(self.get().status_code, 200)
+        self.assertGreaterEqual(time.monotonic() - started, 0.5)
+        self.assertEqual(stub.tokens, ["token a", "token a"])
+
+    def test_secondary_limit_backs_off_exponentially(self):
+        stub = LimitedGitHub(secondary=2)
+        self.start(stub, ["a"])
+        with mock.patch.object(ratelimit.time, "sleep") as sleep:
+            self.assertEqual(self.get().status_code, 200)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [SECONDARY_BACKOFF, SECONDARY_BACKOFF * 2])
+
+    def test_secondary_limit_honours_retry_after(self):
+        stub = LimitedGitHub(secondary=1, retry_after=7)
+        self.start(stub, ["a"])
+        with mock.patch.object(ratelimit.time, "sleep") as sleep:
+            self.assertEqual(self.get().status_code, 200)
+        sleep.assert_called_once_with(7.0)
+
+    def test_gives_up_after_max_attempts(self):
+        stub = LimitedGitHub(secondary=ratelimit.MAX_ATTEMPTS + 1)
+        self.start(stub, ["a"])
+        with mock.patch.object(ratelimit.time, "sleep"):
+            self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(len(stub.tokens), ratelimit.MAX_ATTEMPTS)
+
+    def test_plain_forbidden_is_not_retried(self):
+        stub = LimitedGitHub()
+        self.start(stub, ["a"])
+        self.assertEqual(self.get("/private").status_code, 403)
+        self.assertEqual(len(stub.tokens), 1)
+
+    def test_requests_in_flight_are_capped_per_token(self):
+        stub = LimitedGitHub(latency=0.05)
+        self.start(stub, ["a", "b"], per_token=2)
+        threads = [threading.Thread(target=self.get) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(stub.tokens), 12)
+        self.assertEqual(set(stub.max_active), {"token a", "token b"})
+        self.assertLessEqual(max(stub.max_active.values()), 2)
+
+
+class TokenPoolTest(unittest.TestCase):
+    def test_acquire_blocks_at_the_cap_until_a_release(self):
+        pool = TokenPool(["a"], per_token=1)
+        token = pool.acquire()
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (pool.acquire(), acquired.set()))
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        pool.release(token)
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+    def test_token_with_the_most_quota_left_first(self):
+        pool = TokenPool(["a", "b"])
+        pool.tokens[0].remaining, pool.tokens[1].remaining = 10, 20
+        self.assertEqual(pool.acquire().value, "b")
+
+    def test_concurrency_and_anonymous_pool(self):
+        self.assertEqual(TokenPool(["a", "b"], per_token=3).concurrency, 6)
+        self.assertIsNone(TokenPool([]).tokens[0].value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import contextlib
+import io
+import json
+import unittest
+from unittest import mock
+
+from autocoder_bot import engine
+from autocoder_bot.recovery import CONTINUE, MAX_REPAIRS, recover_files, strip_fence_line
+
+FILES = {"main.py": "print('hello')\n", "README.md": "# App\n", "app.js": "console.log(1);\n"}
+ANSWER = json.dumps(FILES)
+
+
+def answer(content):
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+
+class RecoverFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.send_messages = mock.patch.object(engine, "send_messages").start()
+        self.send_prompt = mock.patch.object(engine, "send_prompt").start()
+        self.addCleanup(mock.patch.stopall)
+        stdout = contextlib.redirect_stdout(io.StringIO())
+        stdout.__enter__()
+        self.addCleanup(stdout.__exit__, None, None, None)
+
+    def recover(self, content):
+        return recover_files("prompt", answer(content), "key")
+
+    def test_clean_answer_needs_no_request(self):
+        self.assertEqual(self.recover(ANSWER), FILES)
+        self.send_messages.assert_not_called()
+        self.send_prompt.assert_not_called()
+
+    def test_fenced_answer_with_prose(self):
+        content = f"Here are the files:\n```json\n{json.dumps(FILES, indent=2)}\n```\nLet me know if you need more."
+        self.assertEqual(self.recover(content), FILES)
+        self.send_prompt.assert_not_called()
+
+    def test_truncated_answer_is_continued(self):
+        cut = len(json.dumps({"main.py": FILES["main.py"]})) + 10
+        self.send_messages.return_value = answer(ANSWER[cut:])
+        self.assertEqual(self.recover(ANSWER[:cut]), FILES)
+        messages = self.send_messages.call_args.args[0]
+        self.assertEqual([message["role"] for message in messages], ["user", "assistant", "user"])
+        self.assertEqual(messages[1]["content"], ANSWER[:cut])
+        self.assertEqual(messages[2]["content"], CONTINUE)
+
+    def test_fenced_continuation(self):
+        cut = len(ANSWER) // 2
+        self.send_messages.return_value = answer(f"```json\n{ANSWER[cut:]}\n```")
+        self.assertEqual(self.recover(f"```json\n{ANSWER[:cut]}"), FILES)
+
+    def test_continuation_in_several_parts(self):
+        first, second = len(ANSWER) // 3, 2 * len(ANSWER) // 3
+        self.send_messages.side_effect = [answer(ANSWER[first:second]), answer(ANSWER[second:])]
+        self.assertEqual(self.recover(ANSWER[:first]), FILES)
+        self.assertEqual(self.send_messages.call_count, 2)
+        self.assertEqual(self.send_messages.call_args.args[0][1]["content"], ANSWER[:second])
+
+    def test_answer_staying_truncated_keeps_complete_files(self):
+        cut = ANSWER.index('"app.js"') + 12
+        self.send_messages.return_value = answer("")
+        self.assertEqual(self.recover(ANSWER[:cut]), {"main.py": FILES["main.py"], "README.md": FILES["README.md"]})
+        self.assertEqual(self.send_messages.call_count, MAX_REPAIRS)
+
+    def test_malformed_answer_asks_for_the_missing_files(self):
+        broken = ANSWER.replace(', "app.js"', ' "app.js"')
+        self.send_prompt.return_value = answer(json.dumps({"app.js": FILES["app.js"]}))
+        self.assertEqual(self.recover(broken), FILES)
+        follow_up = self.send_prompt.call_args.args[0]
+        self.assertIn("README.md, main.py", follow_up)
+        self.send_messages.assert_not_called()
+
+    def test_answer_without_json_is_asked_again(self):
+        self.send_prompt.return_value = answer(ANSWER)
+        self.assertEqual(self.recover("I cannot help with that."), FILES)
+        self.assertEqual(self.send_prompt.call_args.args[0], "prompt")
+
+    def test_nothing_recovered(self):
+        self.send_prompt.return_value = answer("Still no JSON.")
+        with self.assertRaises(engine.GenerationError):
+            self.recover("No JSON here.")
+        self.assertEqual(self.send_prompt.call_count, MAX_REPAIRS)
+
+
+class StripFenceLineTest(unittest.TestCase):
+    def test_fence_line(self):
+        self.assertEqual(strip_fence_line('```json\n"rest"}'), '"rest"}')
+        self.assertEqual(strip_fence_line("  ```"), "")
+
+    def test_plain_continuation(self):
+        self.assertEqual(strip_fence_line('  "rest"}'), '  "rest"}')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import importlib
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from grader import local, stages, transport
+
+
+def stage_repository(stage):
+    return importlib.import_module(f"AutoCoder.stage{stage}.test.repository")
+
+
+class CopiesTest(unittest.TestCase):
+    def test_every_stage_ships_the_same_module(self):
+        self.assertEqual(stages.check(), [], "run python -m grader.stages --sync")
+
+    def test_sync_restores_an_edited_copy(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        for stage in stages.STAGES:
+            os.makedirs(os.path.join(tmp, f"stage{stage}", "test"))
+            shutil.copyfile(stages.module_path(stage), os.path.join(tmp, f"stage{stage}", "test", "repository.py"))
+        course, stages.COURSE = stages.COURSE, tmp
+        self.addCleanup(setattr, stages, "COURSE", course)
+        with open(stages.module_path(3), "a") as f:
+            f.write("# edited by hand\n")
+
+        self.assertEqual(stages.check(), [stages.module_path(3)])
+        self.assertEqual(stages.sync(), [stages.module_path(3)])
+        self.assertEqual(stages.check(), [])
+
+
+class ConfigureTest(unittest.TestCase):
+    @mock.patch.dict(os.environ, {"GRADER_HTTP_CACHE": "off"})
+    def test_stages_share_the_session_and_what_they_loaded(self):
+        first, second = stage_repository(1), stage_repository(2)
+        stages.configure(first)
+        stages.configure(second)
+
+        self.assertIs(first.get_session(), transport.get_session())
+        self.assertIs(second.get_session(), transport.get_session())
+        self.assertIsNone(second.SECONDS_BETWEEN_REQUESTS)
+        for name in stages.SHARED_STATE:
+            self.assertIs(getattr(second, name), getattr(first, name))
+        self.assertLess(stages.configured().index(first), stages.configured().index(second))
+
+
+class LocalSnapshotTest(unittest.TestCase):
+    def test_snapshot_of_a_local_checkout(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        checkout = os.path.join(root, "learner", "autocoder")
+        os.makedirs(os.path.join(checkout, "scripts"))
+        with open(os.path.join(checkout, "scripts", "script.sh"), "w") as f:
+            f.write("#!/bin/bash\n")
+        for args in (["init", "-q"], ["add", "."],
+                     ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "Stage 1"]):
+            subprocess.run(["git", "-C", checkout, *args], check=True, capture_output=True)
+
+        repository = stage_repository(1)
+        snapshot = local.open_snapshot(repository, os.path.join(root, "{owner}", "{repo}"),
+                                       "https://github.com/learner/autocoder")
+        self.assertIsInstance(snapshot, repository.RepoSnapshot)
+        self.assertEqual([entry.path for entry in snapshot.iter_files()], ["scripts/script.sh"])
+        self.assertEqual(snapshot.get_contents("scripts/script.sh").decoded_content, b"#!/bin/bash\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
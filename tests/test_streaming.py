@@ -0,0 +1,103 @@
+import json
+import unittest
+
+from autocoder_bot.streaming import FileObjectParser
+
+
+def feed_chars(parser, text):
+    entries = []
+    for char in text:
+        entries.extend(parser.feed(char))
+    return entries
+
+
+class FileObjectParserTest(unittest.TestCase):
+    def test_whole_object_in_one_chunk(self):
+        parser = FileObjectParser()
+        entries = parser.feed('{"main.py": "print(1)\\n", "README.md": "# App\\n"}')
+        self.assertEqual(entries, [("main.py", "print(1)\n"), ("README.md", "# App\n")])
+        self.assertTrue(parser.done)
+
+    def test_byte_by_byte_matches_json_loads(self):
+        files = {
+            "src/app.js": 'const s = "a \\"quoted\\" }{ string";\nconsole.log(s);\n',
+            "data/config.json": {"nested": {"list": [1, 2, {"deep": "}]"}]}, "flag": True},
+            "windows\\path.txt": "back\\slash and unicode é ☃",
+            "count": 42,
+            "empty": "",
+            "nothing": None,
+        }
+        text = json.dumps(files, indent=2)
+        parser = FileObjectParser()
+        self.assertEqual(dict(feed_chars(parser, text)), files)
+        self.assertTrue(parser.done)
+
+    def test_entries_are_returned_as_soon_as_complete(self):
+        parser = FileObjectParser()
+        self.assertEqual(parser.feed('{"a.py": "x = 1'), [])
+        self.assertEqual(parser.feed('\\n", "b.py'), [("a.py", "x = 1\n")])
+        self.assertFalse(parser.done)
+        self.assertEqual(parser.feed('": "y = 2\\n"}'), [("b.py", "y = 2\n")])
+        self.assertTrue(parser.done)
+
+    def test_escapes_split_across_chunks(self):
+        parser = FileObjectParser()
+        entries = parser.feed('{"a.txt": "quote \\') + parser.feed('" and tab \\') + parser.feed('t end\\u00')
+        entries += parser.feed('e9"}')
+        self.assertEqual(entries, [("a.txt", 'quote " and tab \t endé')])
+
+    def test_escaped_quote_in_key(self):
+        parser = FileObjectParser()
+        self.assertEqual(feed_chars(parser, '{"odd\\"name.txt": "x"}'), [('odd"name.txt', "x")])
+
+    def test_numbers_and_literals_end_at_delimiters(self):
+        parser = FileObjectParser()
+        self.assertEqual(feed_chars(parser, '{"a": 1, "b": true,"c": -2.5e3 }'),
+                         [("a", 1), ("b", True), ("c", -2500.0)])
+        self.assertTrue(parser.done)
+
+    def test_empty_object(self):
+        parser = FileObjectParser()
+        self.assertEqual(parser.feed(" {\n} "), [])
+        self.assertTrue(parser.done)
+
+    def test_trailing_prose_is_ignored(self):
+        parser = FileObjectParser()
+        entries = parser.feed('{"a.py": "pass\\n"}\n\nThis code defines a module. {"b.py": "ignored"}')
+        self.assertEqual(entries, [("a.py", "pass\n")])
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.feed('more prose, even {"c": 1}'), [])
+
+    def test_leading_prose_is_rejected(self):
+        with self.assertRaises(ValueError):
+            FileObjectParser().feed('Here is the code: {"a.py": "pass"}')
+
+    def test_malformed_object_is_rejected(self):
+        for text in ('{"a.py" "pass"}', '{"a.py": "pass" "b.py": "x"}', '{a: 1}', '{"a.py": }'):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                FileObjectParser().feed(text)
+
+    def test_entries_before_a_syntax_error_are_kept(self):
+        parser = FileObjectParser()
+        entries = parser.feed('{"a.py": "pass\\n", ')
+        with self.assertRaises(ValueError):
+            parser.feed("oops")
+        self.assertEqual(entries, [("a.py", "pass\n")])
+        self.assertFalse(parser.done)
+
+    def test_iter_feed_yields_the_entries_before_a_syntax_error_in_the_same_chunk(self):
+        parser = FileObjectParser()
+        entries = []
+        with self.assertRaises(ValueError):
+            for entry in parser.iter_feed('{"a.py": "pass", "b.py": "x" "c.py": "y"}'):
+                entries.append(entry)
+        self.assertEqual(entries, [("a.py", "pass"), ("b.py", "x")])
+
+    def test_truncated_object_is_not_done(self):
+        parser = FileObjectParser()
+        self.assertEqual(parser.feed('{"a.py": "pass\\n", "b.py": "unfinis'), [("a.py", "pass\n")])
+        self.assertFalse(parser.done)
+
+
+if __name__ == "__main__":
+    unittest.main()